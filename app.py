@@ -1,17 +1,51 @@
-from flask import Flask, jsonify, request, render_template
-from gmail_service import fetch_emails, get_gmail_service
-from db import create_table_if_not_exists, insert_email
-from classifier import classify_email
-from db import fetch_stored_emails
-from roadmap import generate_study_roadmap
+from flask import Flask, Response, g, jsonify, request, render_template, stream_with_context
+from gmail_service import get_gmail_service
+from db import create_table_if_not_exists
+from pipeline import run_ingest
+from db import fetch_email_page, fetch_upcoming_drives, search_emails
+from roadmap import build_roadmap_response, stream_study_roadmap, get_cache_stats, get_llm_stats
 from db import fetch_email_by_id
+from jobs import roadmap_jobs
 
 import os
+import json
+import logging
+import db
+import metrics
+import profiling
+from datetime import date
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
+logger = logging.getLogger(__name__)
 
 EMAIL_FILTER = os.getenv("EMAIL_FILTER")
 MAX_EMAILS = int(os.getenv("MAX_EMAILS", 20))
+# "incremental" only downloads mail added since the last sync, "recent" re-lists the newest MAX_EMAILS
+SYNC_MODE = os.getenv("SYNC_MODE", "incremental")
+
+# --- Request metrics (see metrics.py; REQUEST_LOG=1 logs each request) ---
+@app.before_request
+def start_request_timing():
+    g.request_timing = metrics.start_request()
+
+@app.after_request
+def record_response_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def finish_request_timing(error=None):
+    # after_request is skipped when a view's exception propagates (debug mode);
+    # teardown always runs, so failed requests are timed as 500s
+    timing = g.pop("request_timing", None)
+    if timing is not None:
+        endpoint = request.url_rule.rule if request.url_rule else None
+        status = g.pop("response_status", 500)
+        metrics.finish_request(timing, request.method, request.path, endpoint, status)
+
+# --- Request profiling (opt-in with PROFILING=1, see profiling.py) ---
+if profiling.PROFILING:
+    profiling.init_app(app)
 
 # --- Pages ---
 @app.route("/")
@@ -38,64 +72,90 @@ def health():
 @app.route("/fetch-emails", methods=["POST"])
 def fetch_and_store_emails():
     service = get_gmail_service()
-    
-    # Ignore strict filtering to fetch all recent emails for classification
-    emails = fetch_emails(
-        service,
-        from_email=None, 
-        max_results=MAX_EMAILS
-    )
-    
-    print(f"DEBUG: Fetched {len(emails) if emails else 0} emails from Gmail.")
 
+    # "incremental" lists mail added since the last sync, "recent" re-lists the newest MAX_EMAILS;
+    # only mail not stored yet is downloaded, parsed and classified
+    result = run_ingest(service, store=db, sync_mode=SYNC_MODE, max_results=MAX_EMAILS)
 
-    # emails = fetch_emails(
-    #     service,
-    #     from_email=EMAIL_FILTER,
-    #     max_results=MAX_EMAILS
-    # )
+    logger.info(
+        "Listed %d emails, %d already stored, stored %d",
+        result["listed"], result["skipped"], result["stored"]
+    )
 
-    if not emails:
+    if not result["listed"] and SYNC_MODE != "incremental":
         return jsonify({"message": "No emails found"}), 404
 
-    stored = []
-
-    for e in emails:
-        category = classify_email(e["subject"], e["body"])
-
-        insert_email(
-            e["gmail_id"],
-            e["from"],
-            e["subject"],
-            e["body"],
-            category
-        )
-
-        stored.append({
-            "from": e["from"],
-            "subject": e["subject"],
-            "category": category
-        })
-
     return jsonify({
         "message": "Emails processed successfully",
-        "count": len(stored),
-        "emails": stored
+        "fetched": result["listed"],
+        "skipped": result["skipped"],
+        "new": result["stored"],
+        "failed": result["failed"],
+        "count": len(result["emails"]),
+        "emails": result["emails"],
+        "timings": result["stats"]["seconds"]
     })
 
 @app.route("/emails", methods=["GET"])
 def list_emails():
     category = request.args.get("category")  # Placement / Other
     limit = int(request.args.get("limit", 50))
+    cursor = request.args.get("cursor")  # next_cursor from the previous page
+    # Bodies are only sent with view=full; use /api/email/<id> for one email
+    view = request.args.get("view", "summary")
+
+    if view not in ("summary", "full"):
+        return jsonify({"message": "view must be 'summary' or 'full'"}), 400
 
-    emails = fetch_stored_emails(category=category, limit=limit)
+    try:
+        emails, next_cursor = fetch_email_page(category=category, limit=limit, cursor=cursor, view=view)
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
 
     if not emails:
         return jsonify({"message": "No emails found"}), 404
 
     return jsonify({
         "count": len(emails),
-        "emails": emails
+        "emails": emails,
+        "next_cursor": next_cursor
+    })
+
+@app.route("/emails/upcoming", methods=["GET"])
+def list_upcoming_drives():
+    limit = int(request.args.get("limit", 50))
+    cursor = request.args.get("cursor")
+    from_date = request.args.get("from", date.today().isoformat())
+
+    try:
+        emails, next_cursor = fetch_upcoming_drives(from_date, limit=limit, cursor=cursor)
+    except ValueError:
+        return jsonify({"message": "Invalid cursor"}), 400
+
+    return jsonify({
+        "count": len(emails),
+        "emails": emails,
+        "next_cursor": next_cursor
+    })
+
+@app.route("/emails/search", methods=["GET"])
+def search_stored_emails():
+    query = request.args.get("q", "").strip()
+    category = request.args.get("category")
+    limit = int(request.args.get("limit", 20))
+    offset = int(request.args.get("offset", 0))
+
+    if not query:
+        return jsonify({"message": "q is required"}), 400
+
+    # Best matches first; `highlight` is escaped HTML with matched terms in <mark>
+    emails, next_offset = search_emails(query, category=category, limit=limit, offset=offset)
+
+    return jsonify({
+        "query": query,
+        "count": len(emails),
+        "emails": emails,
+        "next_offset": next_offset
     })
 
 @app.route("/api/email/<int:email_id>", methods=["GET"])
@@ -112,14 +172,73 @@ def generate_roadmap(email_id):
     if not email:
         return jsonify({"message": "Email not found"}), 404
 
-    combined_text = f"{email['subject']} {email['body']}"
-    roadmap = generate_study_roadmap(combined_text)
+    # ?refresh=1 bypasses the roadmap cache and regenerates
+    use_cache = request.args.get("refresh") != "1"
+
+    # Runs in the background; repeated requests for the same email share one job
+    job = roadmap_jobs.submit(
+        (email_id, use_cache),
+        profiling.profile_job(build_roadmap_response, f"roadmap job {email_id}"),
+        email,
+        use_cache=use_cache
+    )
 
     return jsonify({
-        "email_subject": email["subject"],
-        "roadmap": roadmap
-    })
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/roadmap/jobs/{job['id']}"
+    }), 202
+
+@app.route("/roadmap/jobs/<job_id>", methods=["GET"])
+def roadmap_job_status(job_id):
+    job = roadmap_jobs.get(job_id)
+
+    if not job:
+        return jsonify({"message": "Job not found"}), 404
+
+    return jsonify(job)
+
+@app.route("/roadmap/stream/<int:email_id>", methods=["GET"])
+def stream_roadmap(email_id):
+    email = fetch_email_by_id(email_id)
+
+    if not email:
+        return jsonify({"message": "Email not found"}), 404
+
+    combined_text = f"{email['subject']} {email['body']}"
+    use_cache = request.args.get("refresh") != "1"
+
+    # Server-Sent Events: meta, one item per finished roadmap step, then done
+    def events():
+        try:
+            for event, data in stream_study_roadmap(combined_text, use_cache=use_cache, target_date=email["drive_date"]):
+                if event == "meta":
+                    data = {**data, "email_subject": email["subject"]}
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route("/roadmap/cache/stats", methods=["GET"])
+def roadmap_cache_stats():
+    return jsonify(get_cache_stats())
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    # Prometheus scrape target: ingest stages, Gmail, storage, Gemini, cache and HTTP timings
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route("/roadmap/llm/stats", methods=["GET"])
+def roadmap_llm_stats():
+    # Gemini call counts, retries, 429s, token usage and latency percentiles
+    return jsonify(get_llm_stats())
 
 if __name__ == "__main__":
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
     create_table_if_not_exists()
     app.run(debug=True)
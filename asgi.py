@@ -0,0 +1,298 @@
+"""
+ASGI entry point serving the same pages and API as app.py with async handlers:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+
+Gmail, SQLite and Gemini calls are blocking, so each runs on a bounded
+thread pool of its own and the event loop only awaits them.
+"""
+import os
+import json
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+
+import db
+import metrics
+from db import (
+    create_table_if_not_exists, fetch_email_by_id, fetch_email_page, fetch_upcoming_drives, search_emails
+)
+from gmail_service import get_gmail_service
+from jobs import roadmap_jobs
+from llm_client import GEMINI_MAX_CONCURRENCY
+from pipeline import run_ingest
+from roadmap import build_roadmap_response, get_cache_stats, get_llm_stats, stream_study_roadmap
+
+# Same settings as app.py
+MAX_EMAILS = int(os.getenv("MAX_EMAILS", 20))
+SYNC_MODE = os.getenv("SYNC_MODE", "incremental")
+
+DB_WORKERS = int(os.getenv("ASGI_DB_WORKERS", 8))
+# Syncs are shared (see sync_mailbox), so one thread runs them; each sync
+# still downloads with FETCH_CONCURRENCY workers of its own
+GMAIL_WORKERS = int(os.getenv("ASGI_GMAIL_WORKERS", 1))
+STREAM_WORKERS = int(os.getenv("ASGI_STREAM_WORKERS", GEMINI_MAX_CONCURRENCY))
+
+db_pool = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="asgi-db")
+gmail_pool = ThreadPoolExecutor(max_workers=GMAIL_WORKERS, thread_name_prefix="asgi-gmail")
+stream_pool = ThreadPoolExecutor(max_workers=STREAM_WORKERS, thread_name_prefix="asgi-stream")
+
+
+async def run_blocking(executor, func, *args, **kwargs):
+    """Run func(*args, **kwargs) on executor and await its result."""
+    loop = asyncio.get_running_loop()
+    # In the caller's context, so the work counts towards its request timing
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, partial(context.run, func, *args, **kwargs))
+
+
+async def iterate_blocking(executor, iterator):
+    """Async iterator over a blocking one; each next() runs on executor."""
+    done = object()
+    while True:
+        item = await run_blocking(executor, next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+@asynccontextmanager
+async def lifespan(app):
+    await run_blocking(db_pool, create_table_if_not_exists)
+    yield
+    for pool in (db_pool, gmail_pool, stream_pool):
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+app = FastAPI(title="Placement email roadmap", lifespan=lifespan)
+app.mount("/static", StaticFiles(directory=os.path.join(BASE_DIR, "static")), name="static")
+templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
+
+
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    # See metrics.py; REQUEST_LOG=1 logs each request
+    timing = metrics.start_request()
+    # An unhandled error becomes a 500 further out; it is timed as one
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.finish_request(timing, request.method, request.url.path, getattr(route, "path", None), status)
+
+
+def message(text, status_code):
+    # Same error body as the Flask app's jsonify({"message": ...})
+    return JSONResponse({"message": text}, status_code=status_code)
+
+
+# -------------------- MAILBOX SYNC --------------------
+_sync_task = None
+
+
+def _sync():
+    service = get_gmail_service()
+    return run_ingest(service, store=db, sync_mode=SYNC_MODE, max_results=MAX_EMAILS)
+
+
+async def sync_mailbox():
+    """
+    Run one Gmail sync. Requests arriving while a sync is in flight await
+    that sync instead of listing and downloading the same mail again.
+    """
+    global _sync_task
+    if _sync_task is None or _sync_task.done():
+        _sync_task = asyncio.ensure_future(run_blocking(gmail_pool, _sync))
+    # A client disconnecting must not cancel the sync the others are waiting on
+    return await asyncio.shield(_sync_task)
+
+
+# --- Pages ---
+@app.get("/")
+async def home_page(request: Request):
+    return templates.TemplateResponse(request, "index.html")
+
+@app.get("/inbox")
+async def inbox_page(request: Request):
+    return templates.TemplateResponse(request, "inbox.html")
+
+@app.get("/email/{email_id}")
+async def email_detail_page(request: Request, email_id: int):
+    return templates.TemplateResponse(request, "email_detail.html", {"email_id": email_id})
+
+@app.get("/roadmap/{email_id}")
+async def roadmap_page(request: Request, email_id: int):
+    return templates.TemplateResponse(request, "roadmap.html", {"email_id": email_id})
+
+# --- API Endpoints ---
+@app.get("/health")
+async def health():
+    return {"status": "running"}
+
+@app.post("/fetch-emails")
+async def fetch_and_store_emails():
+    result = await sync_mailbox()
+
+    if not result["listed"] and SYNC_MODE != "incremental":
+        return message("No emails found", 404)
+
+    return {
+        "message": "Emails processed successfully",
+        "fetched": result["listed"],
+        "skipped": result["skipped"],
+        "new": result["stored"],
+        "failed": result["failed"],
+        "count": len(result["emails"]),
+        "emails": result["emails"],
+        "timings": result["stats"]["seconds"]
+    }
+
+@app.get("/emails")
+async def list_emails(category: str = None, limit: int = 50, cursor: str = None, view: str = "summary"):
+    if view not in ("summary", "full"):
+        return message("view must be 'summary' or 'full'", 400)
+
+    try:
+        emails, next_cursor = await run_blocking(
+            db_pool, fetch_email_page, category=category, limit=limit, cursor=cursor, view=view
+        )
+    except ValueError:
+        return message("Invalid cursor", 400)
+
+    if not emails:
+        return message("No emails found", 404)
+
+    return {
+        "count": len(emails),
+        "emails": emails,
+        "next_cursor": next_cursor
+    }
+
+@app.get("/emails/upcoming")
+async def list_upcoming_drives(limit: int = 50, cursor: str = None, from_date: str = Query(None, alias="from")):
+    from_date = from_date or date.today().isoformat()
+
+    try:
+        emails, next_cursor = await run_blocking(
+            db_pool, fetch_upcoming_drives, from_date, limit=limit, cursor=cursor
+        )
+    except ValueError:
+        return message("Invalid cursor", 400)
+
+    return {
+        "count": len(emails),
+        "emails": emails,
+        "next_cursor": next_cursor
+    }
+
+@app.get("/emails/search")
+async def search_stored_emails(q: str = "", category: str = None, limit: int = 20, offset: int = 0):
+    query = q.strip()
+    if not query:
+        return message("q is required", 400)
+
+    emails, next_offset = await run_blocking(
+        db_pool, search_emails, query, category=category, limit=limit, offset=offset
+    )
+
+    return {
+        "query": query,
+        "count": len(emails),
+        "emails": emails,
+        "next_offset": next_offset
+    }
+
+@app.get("/api/email/{email_id}")
+async def get_email_detail(email_id: int):
+    email = await run_blocking(db_pool, fetch_email_by_id, email_id)
+    if not email:
+        return message("Email not found", 404)
+    return email
+
+@app.post("/roadmap/generate/{email_id}")
+async def generate_roadmap(email_id: int, refresh: str = None):
+    email = await run_blocking(db_pool, fetch_email_by_id, email_id)
+
+    if not email:
+        return message("Email not found", 404)
+
+    use_cache = refresh != "1"
+
+    # Same background job queue as the Flask app; it bounds the Gemini work
+    job = roadmap_jobs.submit(
+        (email_id, use_cache),
+        build_roadmap_response,
+        email,
+        use_cache=use_cache
+    )
+
+    return JSONResponse({
+        "job_id": job["id"],
+        "status": job["status"],
+        "status_url": f"/roadmap/jobs/{job['id']}"
+    }, status_code=202)
+
+@app.get("/roadmap/jobs/{job_id}")
+async def roadmap_job_status(job_id: str):
+    job = roadmap_jobs.get(job_id)
+
+    if not job:
+        return message("Job not found", 404)
+
+    return job
+
+@app.get("/roadmap/stream/{email_id}")
+async def stream_roadmap(email_id: int, refresh: str = None):
+    email = await run_blocking(db_pool, fetch_email_by_id, email_id)
+
+    if not email:
+        return message("Email not found", 404)
+
+    combined_text = f"{email['subject']} {email['body']}"
+    use_cache = refresh != "1"
+
+    async def events():
+        steps = stream_study_roadmap(combined_text, use_cache=use_cache, target_date=email["drive_date"])
+        try:
+            async for event, data in iterate_blocking(stream_pool, steps):
+                if event == "meta":
+                    data = {**data, "email_subject": email["subject"]}
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'message': str(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/roadmap/cache/stats")
+async def roadmap_cache_stats():
+    return await run_blocking(db_pool, get_cache_stats)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/roadmap/llm/stats")
+async def roadmap_llm_stats():
+    return get_llm_stats()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host=os.getenv("HOST", "127.0.0.1"), port=int(os.getenv("PORT", 8000)))
@@ -0,0 +1,166 @@
+"""
+Load-test the Flask dev server (app.py) against the ASGI app (asgi.py under
+uvicorn) on the same seeded SQLite database and fake Gmail service:
+
+    python -m benchmarks.bench_asgi --rows 2000 --concurrency 1 16 64 --seconds 5
+
+Each server runs in its own process. Reports requests/sec and p50/p99
+latency per endpoint; any non-2xx response fails the run.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Both servers get the same fake Gmail service (see benchmarks.fake_gmail)
+FAKE_GMAIL = (
+    "from benchmarks.fake_gmail import FakeGmailService; "
+    "{module}.get_gmail_service = lambda: FakeGmailService({messages}, rtt={rtt})"
+)
+SERVERS = {
+    "flask dev server": (
+        "import app; " + FAKE_GMAIL.format(module="app", messages="{messages}", rtt="{rtt}") + "; "
+        "app.create_table_if_not_exists(); app.app.run(port={port}, threaded=True)"
+    ),
+    "asgi + uvicorn": (
+        "import asgi, uvicorn; " + FAKE_GMAIL.format(module="asgi", messages="{messages}", rtt="{rtt}") + "; "
+        "uvicorn.run(asgi.app, port={port}, log_level='warning')"
+    ),
+}
+
+
+def endpoints(rows):
+    return {
+        "GET /emails": lambda: ("GET", "/emails?limit=50"),
+        "GET /api/email/<id>": lambda: ("GET", f"/api/email/{random.randint(1, rows)}"),
+        "POST /fetch-emails": lambda: ("POST", "/fetch-emails"),
+    }
+
+
+def seed(path, rows):
+    os.environ["DB_NAME"] = path
+    import db
+    from benchmarks.bench_db import make_rows
+
+    db.DB_NAME = path
+    db.create_table_if_not_exists()
+    db.insert_emails(make_rows(rows))
+    db.close_db_connection()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(code, env):
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-c", code.format(port=port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if asyncio.run(Connection("127.0.0.1", port).request("GET", "/health")) == 200:
+                return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    sys.exit(f"Server did not start: {code}")
+
+
+class Connection:
+    """
+    Minimal keep-alive HTTP/1.1 client. httpx's connection pool costs more
+    CPU per request than the servers being measured, so it is not used here.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = self._writer = None
+
+    async def request(self, method, path):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: 0\r\n\r\n".encode())
+
+        status = int((await self._reader.readline()).split()[1])
+        length, close = 0, False
+        while (line := await self._reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode("latin-1").partition(":")
+            name = name.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "connection" and "close" in value.lower():
+                close = True
+        await self._reader.readexactly(length)
+
+        # The Flask dev server speaks HTTP/1.0 and closes after every response
+        if close:
+            self._writer.close()
+            self._writer = None
+        return status
+
+
+async def load(port, make_request, concurrency, seconds):
+    latencies = []
+    stop = time.monotonic() + seconds
+
+    async def worker():
+        connection = Connection("127.0.0.1", port)
+        while time.monotonic() < stop:
+            method, path = make_request()
+            start = time.perf_counter()
+            status = await connection.request(method, path)
+            latencies.append(time.perf_counter() - start)
+            assert status < 300, f"{method} {path}: {status}"
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(latencies) / elapsed, p50, p99
+
+
+def run(rows, concurrency_levels, seconds, messages, rtt):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(path, rows)
+        env = dict(os.environ, DB_NAME=path, SYNC_MODE="recent", MAX_EMAILS=str(messages), GEMINI_API_KEY="")
+
+        print(f"{'server':<18}{'endpoint':<22}{'conc':>6}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}")
+        for server, code in SERVERS.items():
+            process, port = start_server(code.format(messages=messages, rtt=rtt, port="{port}"), env)
+            try:
+                for endpoint, make_request in endpoints(rows).items():
+                    for concurrency in concurrency_levels:
+                        rps, p50, p99 = asyncio.run(load(port, make_request, concurrency, seconds))
+                        print(f"{server:<18}{endpoint:<22}{concurrency:>6}{rps:>9.0f}"
+                              f"{p50 * 1000:>9.1f}{p99 * 1000:>9.1f}")
+            finally:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--messages", type=int, default=50, help="mailbox size of the fake Gmail service")
+    parser.add_argument("--rtt", type=float, default=0.05, help="fake Gmail round trip, seconds")
+    args = parser.parse_args()
+    run(args.rows, args.concurrency, args.seconds, args.messages, args.rtt)
@@ -0,0 +1,93 @@
+"""
+Throughput of classify_email over a synthetic corpus of long bodies, against
+the original sequential-scan classifier (tests/test_classifier.py checks
+that both agree).
+
+    python -m benchmarks.bench_classifier --emails 2000 --words 2000
+"""
+import argparse
+import random
+import time
+
+import classifier
+
+
+def legacy_classify_email(subject, body):
+    # classifier.classify_email before the compiled matcher
+    text = f"{subject} {body}".lower()
+
+    for word in classifier.STRONG_KEYWORDS:
+        if word in text:
+            return "Placement"
+
+    if any(w in text for w in classifier.WEAK_KEYWORDS):
+        for ctx in classifier.CONTEXT_KEYWORDS:
+            if ctx in text:
+                return "Placement"
+        return "Other"
+
+    for word in classifier.NON_PLACEMENT_KEYWORDS:
+        if word in text:
+            return "Other"
+
+    return "Other"
+
+
+FILLER = (
+    "the students are informed about schedule college department lab report "
+    "project submission please note regards kindly find attached details"
+).split()
+KEYWORDS = [word for words in classifier.RULES.values() for word in words]
+
+
+def make_corpus(count, words, seed=0):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        tokens = [rng.choice(FILLER) for _ in range(words)]
+        # Most mails carry a few keywords; some are glued to neighbours
+        # ("tpoffer letter") to exercise overlapping matches
+        for _ in range(rng.choice([0, 0, 1, 2, 4])):
+            word = rng.choice(KEYWORDS).upper() if rng.random() < 0.2 else rng.choice(KEYWORDS)
+            pos = rng.randrange(len(tokens))
+            tokens[pos] = word if rng.random() < 0.7 else tokens[pos] + word
+        corpus.append((f"Notice {i}", " ".join(tokens)))
+    return corpus
+
+
+def throughput(corpus, classify):
+    start = time.perf_counter()
+    for subject, body in corpus:
+        classify(subject, body)
+    return len(corpus) / (time.perf_counter() - start)
+
+
+def run(count, words):
+    corpus = make_corpus(count, words)
+
+    backends = [("compiled matcher", classifier._matcher)]
+    if classifier.ahocorasick is not None:
+        # Also measure the `in` scan fallback used without pyahocorasick
+        saved, classifier.ahocorasick = classifier.ahocorasick, None
+        backends.append(("compiled matcher (in scans)", classifier.KeywordMatcher(KEYWORDS)))
+        classifier.ahocorasick = saved
+
+    print(f"{count} emails x {words} words")
+    print(f"{'classifier':<28}{'emails/sec':>12}")
+    print(f"{'legacy sequential scans':<28}{throughput(corpus, legacy_classify_email):>12.0f}")
+
+    default_matcher = classifier._matcher
+    try:
+        for name, matcher in backends:
+            classifier._matcher = matcher
+            print(f"{name:<28}{throughput(corpus, classifier.classify_email):>12.0f}")
+    finally:
+        classifier._matcher = default_matcher
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.emails, args.words)
@@ -0,0 +1,104 @@
+"""
+Accuracy and throughput of roadmap date extraction, old vs date_scanner.
+
+    python -m benchmarks.bench_dates --emails 2000
+"""
+import argparse
+import random
+import re
+import time
+from datetime import date, datetime
+
+from date_scanner import best_date
+
+TODAY = date(2025, 3, 1)
+
+# (email text, the date a roadmap should target)
+CASES = [
+    ("Interview scheduled on 12 Mar 2025.", date(2025, 3, 12)),
+    ("Campus drive on 12th March 2025 at 9 AM.", date(2025, 3, 12)),
+    ("The drive will be held on 2025-03-12 in the main block.", date(2025, 3, 12)),
+    ("Technical round: Wednesday, 12 March 2025", date(2025, 3, 12)),
+    ("Online test on March 12th", date(2025, 3, 12)),
+    ("Interview date: 12/03/2025", date(2025, 3, 12)),
+    ("Final round on March 12, 2025", date(2025, 3, 12)),
+    ("Last date to register: 5 Mar 2025. Interview on 12 Mar 2025.", date(2025, 3, 12)),
+    ("Apply by 05/03/2025\nDrive date: 20 March 2025", date(2025, 3, 20)),
+    ("Registration closes 4th March. Assessment on 10th March and final interview on 14th March.", date(2025, 3, 14)),
+    ("Mail sent on 1 Feb 2025. Drive on 15 Mar 2025.", date(2025, 3, 15)),
+    ("The interview was held on 10 Feb 2025.", date(2025, 2, 10)),
+    ("Walk-in drive on Sat, 8th Mar", date(2025, 3, 8)),
+    ("Register on or before 7 March 2025.", date(2025, 3, 7)),
+    ("Hackathon finale: 22-03-2025", date(2025, 3, 22)),
+    ("Reporting time 9:30 AM on Friday 14 March 2025", date(2025, 3, 14)),
+    ("No dates in this mail at all.", None),
+]
+
+
+def legacy_extract_target_date(text):
+    # roadmap.extract_target_date before date_scanner
+    patterns = [
+        r"\b\d{1,2}\s(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s\d{4}",
+        r"\b\d{1,2}/\d{1,2}/\d{4}",
+        r"(January|February|March|April|May|June|July|August|September|October|November|December)\s\d{1,2},\s\d{4}"
+    ]
+
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            date_str = match.group()
+            for fmt in ("%d %b %Y", "%d/%m/%Y", "%B %d, %Y"):
+                try:
+                    return datetime.strptime(date_str, fmt)
+                except:
+                    pass
+    return None
+
+
+def legacy_best_date(text, today):
+    found = legacy_extract_target_date(text)
+    return found.date() if found else None
+
+
+def accuracy(extract):
+    correct = sum(extract(text, TODAY) == expected for text, expected in CASES)
+    return correct / len(CASES)
+
+
+def make_corpus(count, words, seed=0):
+    rng = random.Random(seed)
+    filler = "dear students please find the details of the upcoming placement activity below".split()
+    corpus = []
+    for _ in range(count):
+        tokens = [rng.choice(filler) for _ in range(words)]
+        text, _ = rng.choice(CASES)
+        tokens.insert(rng.randrange(len(tokens)), text)
+        corpus.append(" ".join(tokens))
+    return corpus
+
+
+def throughput(corpus, extract):
+    start = time.perf_counter()
+    for text in corpus:
+        extract(text, TODAY)
+    return len(corpus) / (time.perf_counter() - start)
+
+
+def run(count, words):
+    corpus = make_corpus(count, words)
+    print(f"{len(CASES)} labelled cases, {count} emails x {words} words")
+    print(f"{'extractor':<20}{'accuracy':>10}{'emails/sec':>12}")
+    for name, extract in (("legacy", legacy_best_date), ("date_scanner", best_date)):
+        print(f"{name:<20}{accuracy(extract):>10.0%}{throughput(corpus, extract):>12.0f}")
+
+    misses = [(text, expected, best_date(text, TODAY)) for text, expected in CASES
+              if best_date(text, TODAY) != expected]
+    assert not misses, f"date_scanner misses: {misses}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=500)
+    args = parser.parse_args()
+    run(args.emails, args.words)
@@ -0,0 +1,78 @@
+"""
+Compare the old connect-insert-commit-close path with db.insert_emails.
+
+    python -m benchmarks.bench_db --sizes 1000 10000
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import db
+
+
+def make_rows(count, offset=0):
+    return [
+        {
+            "gmail_id": f"gmail{offset + i:08d}",
+            "sender": "Placement Cell <placement@college.edu>",
+            "subject": f"Campus drive #{i}",
+            "body": "Company is hiring for the role of Software Engineer. " * 40,
+            "category": "Placement" if i % 3 else "Other",
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_insert(rows):
+    # What insert_email did per row before connection reuse
+    for row in rows:
+        conn = sqlite3.connect(db.DB_NAME)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("""
+                INSERT INTO emails (gmail_id, sender, subject, body, category)
+                VALUES (:gmail_id, :sender, :subject, :body, :category)
+            """, row)
+            conn.commit()
+        except sqlite3.IntegrityError:
+            pass
+        cursor.close()
+        conn.close()
+
+
+def per_row_insert(rows):
+    for row in rows:
+        db.insert_email(row["gmail_id"], row["sender"], row["subject"], row["body"], row["category"])
+
+
+STRATEGIES = [
+    ("legacy per-row connect", legacy_insert),
+    ("pooled per-row commit", per_row_insert),
+    ("bulk insert_emails", db.insert_emails),
+]
+
+
+def run(sizes):
+    print(f"{'rows':>8}  {'strategy':<26}{'seconds':>9}{'rows/sec':>12}")
+    for size in sizes:
+        rows = make_rows(size)
+        for name, insert in STRATEGIES:
+            with tempfile.TemporaryDirectory() as tmp:
+                db.DB_NAME = os.path.join(tmp, "bench.db")
+                db.create_table_if_not_exists()
+
+                start = time.perf_counter()
+                insert(rows)
+                elapsed = time.perf_counter() - start
+
+                db.close_db_connection()
+            print(f"{size:>8}  {name:<26}{elapsed:>9.3f}{size / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,44 @@
+"""
+Compare fetch_emails download strategies against the fake Gmail service.
+
+    python -m benchmarks.bench_fetch --sizes 10 100 1000 --rtt 0.01
+"""
+import argparse
+import time
+
+from benchmarks.fake_gmail import FakeGmailService
+from gmail_service import fetch_emails
+
+STRATEGIES = [
+    # name, concurrency, batch_size
+    ("sequential (old loop)", 1, 1),
+    ("worker pool x8", 8, 1),
+    ("batch 50", 1, 50),
+    ("batch 50 x4 workers", 4, 50),
+]
+
+
+def run(sizes, rtt, per_message):
+    print(f"{'messages':>8}  {'strategy':<24}{'seconds':>9}{'round trips':>13}")
+    for size in sizes:
+        for name, concurrency, batch_size in STRATEGIES:
+            service = FakeGmailService(size, rtt=rtt, per_message=per_message)
+            start = time.perf_counter()
+            emails = fetch_emails(
+                service,
+                max_results=size,
+                concurrency=concurrency,
+                batch_size=batch_size
+            )
+            elapsed = time.perf_counter() - start
+            assert len(emails) == size
+            print(f"{size:>8}  {name:<24}{elapsed:>9.3f}{service.round_trips:>13}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--rtt", type=float, default=0.01)
+    parser.add_argument("--per-message", type=float, default=0.0002)
+    args = parser.parse_args()
+    run(args.sizes, args.rtt, args.per_message)
@@ -0,0 +1,55 @@
+"""
+Throughput of the html -> text converters on newsletter-style mail
+(tests/test_html_text.py checks they match the original BeautifulSoup
+html.parser result).
+
+    python -m benchmarks.bench_html --emails 500 --rows 40
+"""
+import argparse
+import random
+import time
+
+from html_text import HTML_CONVERTERS
+
+def newsletter(index, rows, rng):
+    """Newsletter-style mail: nested layout tables, inline styles and scripts."""
+    cells = "".join(
+        f'<tr><td style="padding:8px;font-family:Arial"><a href="https://example.com/{index}/{r}">'
+        f'<img src="x.png" alt="">Company {rng.randrange(1000)} drive</a></td>'
+        f'<td><span style="color:#333">Interview on {rng.randrange(1, 28)} Mar 2030 &amp; '
+        f'CTC {rng.randrange(3, 40)} LPA</span><br>Apply by the registration link</td></tr>'
+        for r in range(rows)
+    )
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Placement digest</title>"
+        "<style>td { border: 0 } .x { display: none }</style>"
+        f"<script>window.track && track({index});</script></head>"
+        f"<body><center><table width='600'><tbody>{cells}</tbody></table>"
+        "<!-- footer --><p>Unsubscribe&nbsp;|&nbsp;Preferences</p></center></body></html>"
+    )
+
+
+def throughput(corpus, convert):
+    start = time.perf_counter()
+    for html in corpus:
+        convert(html)
+    return len(corpus) / (time.perf_counter() - start)
+
+
+def run(count, rows):
+    rng = random.Random(0)
+    corpus = [newsletter(i, rows, rng) for i in range(count)]
+
+    size = sum(map(len, corpus)) / count / 1024
+    print(f"{count} newsletters, {size:.0f} KB each")
+    print(f"{'converter':<12}{'emails/sec':>12}")
+    for name, convert in HTML_CONVERTERS.items():
+        print(f"{name:<12}{throughput(corpus, convert):>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=40)
+    args = parser.parse_args()
+    run(args.emails, args.rows)
@@ -0,0 +1,106 @@
+"""
+Parse time, response size and peak memory per message for the legacy raw
+parser, the bounded raw parser and format='full', on mails carrying an
+HTML alternative and a large PDF attachment.
+
+    python -m benchmarks.bench_mime --messages 20 --attachment-mb 5
+"""
+import argparse
+import base64
+import json
+import resource
+import time
+import tracemalloc
+from email import message_from_bytes
+
+from bs4 import BeautifulSoup
+
+from benchmarks.fake_gmail import make_raw_message, to_full_format
+from gmail_service import parse_full_message, parse_raw_message
+
+
+def legacy_parse_raw_message(msg_id, msg_data, from_email=None):
+    # gmail_service.parse_raw_message before bounded MIME parsing:
+    # every part, attachments included, is decoded
+    raw_data = base64.urlsafe_b64decode(msg_data['raw'])
+    mime_msg = message_from_bytes(raw_data)
+
+    subject = mime_msg.get('Subject', '')
+    sender = mime_msg.get('From', '')
+
+    if from_email and from_email.lower() not in sender.lower():
+        return None
+
+    body = ""
+
+    for part in mime_msg.walk():
+        content_type = part.get_content_type()
+        payload = part.get_payload(decode=True)
+
+        if not payload:
+            continue
+
+        text = payload.decode(errors="ignore")
+
+        if content_type == "text/plain":
+            body = text
+            break
+
+        if content_type == "text/html" and not body:
+            body = BeautifulSoup(text, "html.parser").get_text()
+
+    return {
+        "gmail_id": msg_id,
+        "subject": subject,
+        "from": sender,
+        "body": body.strip()
+    }
+
+
+def make_responses(count, attachment_bytes):
+    """JSON response bodies as Gmail would send them, per format."""
+    raw, full = [], []
+    for i in range(count):
+        message = make_raw_message(i, html=True, attachment_bytes=attachment_bytes)
+        raw.append(json.dumps({"id": str(i), "raw": message}))
+        full.append(json.dumps({"id": str(i), "payload": to_full_format(message)}))
+    return raw, full
+
+
+def measure(responses, parse):
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = [parse(str(i), json.loads(body)) for i, body in enumerate(responses)]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return results, elapsed, peak
+
+
+def run(count, attachment_mb):
+    raw, full = make_responses(count, int(attachment_mb * 1024 * 1024))
+    cases = (
+        ("legacy raw", raw, legacy_parse_raw_message),
+        ("raw", raw, parse_raw_message),
+        ("full", full, parse_full_message),
+    )
+
+    print(f"{count} messages, {attachment_mb} MB attachment each")
+    print(f"{'parser':<14}{'KB/response':>13}{'ms/message':>12}{'peak MB':>10}")
+    bodies = []
+    for name, responses, parse in cases:
+        results, elapsed, peak = measure(responses, parse)
+        bodies.append([r["body"] for r in results])
+        size = sum(map(len, responses)) / count / 1024
+        print(f"{name:<14}{size:>13.0f}{elapsed / count * 1000:>12.2f}{peak / 2**20:>10.1f}")
+
+    print(f"process max RSS: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    assert bodies[0] == bodies[1] == bodies[2], "parsers disagree on body text"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20)
+    parser.add_argument("--attachment-mb", type=float, default=5)
+    args = parser.parse_args()
+    run(args.messages, args.attachment_mb)
@@ -0,0 +1,106 @@
+"""
+Latency of db.search_emails (FTS5, bm25) against a LIKE scan, plus the
+cost of indexing at insert time and of a full rebuild.
+
+    python -m benchmarks.bench_search --emails 100000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import db
+
+VOCABULARY = (
+    "company hiring role software engineer analyst intern drive interview online test "
+    "technical round eligibility criteria registration link apply package ctc lpa "
+    "students placement cell campus venue schedule aptitude coding java python sql "
+    "cloud data machine learning frontend backend devops testing support consultant"
+).split()
+RARE = ["kubernetes", "haskell", "blockchain", "fintech", "rust"]
+
+QUERIES = [
+    ("common (~90% of mails)", "drive"),
+    ("rare term", "haskell"),
+    ("two terms", "python interview"),
+    ("prefix", "kube*"),
+    ("phrase-ish", "machine learning intern"),
+]
+
+
+def make_rows(count, words=120, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        body = [rng.choice(VOCABULARY) for _ in range(words)]
+        if i % 50 == 0:
+            body.insert(rng.randrange(words), rng.choice(RARE))
+        rows.append({
+            "gmail_id": f"gmail{i:08d}",
+            "sender": f"Placement Cell <placement{i % 13}@college.edu>",
+            "subject": f"{rng.choice(VOCABULARY).title()} {rng.choice(VOCABULARY)} update #{i}",
+            "body": " ".join(body),
+            "category": "Placement" if i % 3 else "Other",
+        })
+    return rows
+
+
+def like_scan(query):
+    # Without an index, ranking matches means reading every row
+    pattern = f"%{query.rstrip('*')}%"
+    return db.get_db_connection().execute("""
+        SELECT COUNT(*) FROM emails
+        WHERE subject LIKE ? OR sender LIKE ? OR body LIKE ?
+    """, (pattern, pattern, pattern)).fetchone()
+
+
+def latency(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def run(count, repeat, chunk=10000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_table_if_not_exists()
+
+        rows = make_rows(count)
+        start = time.perf_counter()
+        for i in range(0, count, chunk):
+            db.insert_emails(rows[i:i + chunk])
+        insert_elapsed = time.perf_counter() - start
+        del rows
+
+        start = time.perf_counter()
+        db.rebuild_search_index()
+        rebuild_elapsed = time.perf_counter() - start
+
+        print(f"{count} emails: insert with triggers {count / insert_elapsed:.0f} rows/sec, "
+              f"rebuild {rebuild_elapsed:.1f}s")
+        print(f"{'query':<24}{'hits':>6}{'fts p50 ms':>12}{'fts p95 ms':>12}{'scan p50 ms':>13}")
+
+        for name, query in QUERIES:
+            hits, _ = db.search_emails(query, limit=20)
+            fts_p50, fts_p95 = latency(lambda: db.search_emails(query, limit=20), repeat)
+            like_p50, _ = latency(lambda: like_scan(query), max(1, repeat // 5))
+            print(f"{name:<24}{len(hits):>6}{fts_p50:>12.2f}{fts_p95:>12.2f}{like_p50:>13.2f}")
+
+        deep_p50, deep_p95 = latency(lambda: db.search_emails("python", limit=20, offset=1000), repeat)
+        print(f"{'offset 1000':<24}{'':>6}{deep_p50:>12.2f}{deep_p95:>12.2f}")
+
+        db.close_db_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--emails", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    run(args.emails, args.repeat)
@@ -0,0 +1,83 @@
+"""
+Cold-start cost of importing the app, from `python -X importtime`:
+
+    python -m benchmarks.bench_startup --runs 5 --top 15 --budget-ms 600
+
+Each run imports the module in a fresh interpreter. Prints the slowest
+imports by cumulative time and fails if the median import exceeds the budget.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import time: self [us] | cumulative | imported package
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Heavy SDKs that should only load when first used
+DEFERRED = ("google.genai", "googleapiclient", "google_auth_oauthlib", "bs4")
+
+
+def import_profile(module):
+    """Return {module: (self_us, cumulative_us, depth)} and the total us for one fresh import."""
+    env = dict(os.environ, GEMINI_API_KEY="")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr}")
+
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = len(indent) // 2
+        modules[name] = (int(self_us), int(cumulative_us), depth)
+        if name == module:
+            total = int(cumulative_us)
+    return modules, total
+
+
+def run(module, runs, top, budget_ms):
+    totals = []
+    cumulative = defaultdict(list)
+    for _ in range(runs):
+        modules, total = import_profile(module)
+        totals.append(total / 1000)
+        for name, (_, cumulative_us, depth) in modules.items():
+            cumulative[name].append((cumulative_us / 1000, depth))
+
+    print(f"Slowest imports under {module} (median of {runs} runs)")
+    print(f"{'ms':>9}  module")
+    ranked = sorted(
+        ((statistics.median(ms for ms, _ in samples), samples[0][1], name)
+         for name, samples in cumulative.items() if name != module),
+        reverse=True
+    )
+    for ms, depth, name in ranked[:top]:
+        print(f"{ms:>9.1f}  {'  ' * depth}{name}")
+
+    loaded = [name for name in cumulative if name.startswith(DEFERRED)]
+    median = statistics.median(totals)
+    print(f"\nimport {module}: median {median:.1f} ms, min {min(totals):.1f} ms, max {max(totals):.1f} ms")
+    assert not loaded, f"Deferred SDKs imported at startup: {', '.join(sorted(loaded))}"
+    assert median <= budget_ms, f"Cold start {median:.1f} ms is over the {budget_ms} ms budget"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=600)
+    args = parser.parse_args()
+    run(args.module, args.runs, args.top, args.budget_ms)
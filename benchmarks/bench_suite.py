@@ -0,0 +1,197 @@
+"""
+End-to-end benchmark suite: ingest, listing and roadmap scenarios run against
+the fake Gmail service (plain, HTML and attachment mail) and a fake Gemini
+backend, on a scratch SQLite database.
+
+    python -m benchmarks.bench_suite --messages 500 --output results.json
+    python -m benchmarks.bench_suite --baseline results.json --threshold 0.15
+
+Scenarios:
+    cold_sync         first incremental sync into an empty database
+    warm_resync       incremental sync picking up --new-messages new mails
+    recent_resync     re-listing the newest mail when all of it is stored
+    listing           paging through every stored email, then opening each
+    roadmap_cold      one roadmap per placement email with an empty cache
+    roadmap_cached    the same roadmaps again, served from the cache
+
+Each scenario reports the median of --repeat runs. With --baseline, a
+scenario more than --threshold slower than the baseline fails the run.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import db
+import roadmap
+from benchmarks.fake_gmail import MESSAGE_KINDS, FakeGmailService
+from gmail_service import FETCH_FORMAT
+from llm_client import FakeBackend, LLMClient
+from pipeline import run_ingest
+
+ROADMAP_RESPONSE = json.dumps({
+    "status": "active",
+    "company": "Company",
+    "job_role": "Software Engineer",
+    "roadmap": [
+        {"sequence_no": i, "time_slot": f"Day {i}", "title": "Practice", "description": "", "tasks": ["DSA"]}
+        for i in range(1, 8)
+    ]
+})
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def run_once(args):
+    """One pass over every scenario; returns {scenario: (seconds, items)}."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_table_if_not_exists()
+
+        service = FakeGmailService(args.messages, rtt=args.rtt, per_message=args.per_message, kinds=args.kinds)
+        service.preload(FETCH_FORMAT)
+
+        seconds, result = timed(lambda: run_ingest(service, store=db, max_results=args.messages))
+        assert result["stored"] == args.messages, result["stored"]
+        results["cold_sync"] = (seconds, args.messages)
+
+        service.add_messages(args.new_messages)
+        service.preload(FETCH_FORMAT)
+        seconds, result = timed(lambda: run_ingest(service, store=db, max_results=args.messages))
+        assert result["stored"] == args.new_messages, result["stored"]
+        results["warm_resync"] = (seconds, args.new_messages)
+
+        total = args.messages + args.new_messages
+        seconds, result = timed(lambda: run_ingest(service, store=db, sync_mode="recent", max_results=total))
+        assert (result["stored"], result["skipped"]) == (0, total), result
+        results["recent_resync"] = (seconds, total)
+
+        def listing():
+            ids, cursor = [], None
+            while True:
+                emails, cursor = db.fetch_email_page(limit=50, cursor=cursor)
+                ids.extend(email["id"] for email in emails)
+                if cursor is None:
+                    break
+            for email_id in ids:
+                db.fetch_email_by_id(email_id)
+            return ids
+
+        seconds, ids = timed(listing)
+        assert len(ids) == total, len(ids)
+        results["listing"] = (seconds, total)
+
+        roadmap.llm = LLMClient(
+            FakeBackend(ROADMAP_RESPONSE, latency=args.llm_latency), roadmap.MODEL_NAME,
+            requests_per_minute=60_000_000, burst=args.roadmaps
+        )
+        emails = [db.fetch_email_by_id(email_id) for email_id in ids[:args.roadmaps]]
+
+        def roadmaps():
+            return [roadmap.build_roadmap_response(email) for email in emails]
+
+        db.clear_roadmap_cache()
+        seconds, built = timed(roadmaps)
+        assert roadmap.llm.metrics()["calls"] == len(emails)
+        results["roadmap_cold"] = (seconds, len(built))
+
+        seconds, built = timed(roadmaps)
+        assert roadmap.llm.metrics()["calls"] == len(emails), "cached roadmaps called the model"
+        results["roadmap_cached"] = (seconds, len(built))
+
+        db.close_db_connection()
+    return results
+
+
+def run(args):
+    runs = [run_once(args) for _ in range(args.repeat)]
+
+    scenarios = {}
+    for name in runs[0]:
+        seconds = [run[name][0] for run in runs]
+        items = runs[0][name][1]
+        median = statistics.median(seconds)
+        scenarios[name] = {
+            "seconds": round(median, 5),
+            "runs": [round(s, 5) for s in seconds],
+            "items": items,
+            "items_per_second": round(items / median, 1) if median else None,
+        }
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "messages": args.messages,
+            "new_messages": args.new_messages,
+            "kinds": list(args.kinds),
+            "rtt": args.rtt,
+            "per_message": args.per_message,
+            "llm_latency": args.llm_latency,
+            "roadmaps": args.roadmaps,
+            "repeat": args.repeat,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def compare(report, baseline, threshold):
+    """Print each scenario against baseline; return the names that regressed."""
+    regressions = []
+    print(f"\n{'scenario':<16}{'baseline s':>12}{'now s':>10}{'change':>9}")
+    for name, result in report["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if not before:
+            print(f"{name:<16}{'-':>12}{result['seconds']:>10.4f}{'new':>9}")
+            continue
+        change = result["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<16}{before['seconds']:>12.4f}{result['seconds']:>10.4f}{change:>+9.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--new-messages", type=int, default=50)
+    parser.add_argument("--kinds", nargs="+", choices=sorted(MESSAGE_KINDS), default=["plain", "html", "attachment"])
+    parser.add_argument("--rtt", type=float, default=0.01, help="fake Gmail round trip, seconds")
+    parser.add_argument("--per-message", type=float, default=0.0002, help="fake Gmail cost per message, seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="fake Gemini call, seconds")
+    parser.add_argument("--roadmaps", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report here ('-' for stdout)")
+    parser.add_argument("--baseline", help="JSON report from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown, e.g. 0.15 = 15%%")
+    args = parser.parse_args()
+
+    report = run(args)
+
+    print(f"{'scenario':<16}{'seconds':>10}{'items':>8}{'items/s':>10}")
+    for name, result in report["scenarios"].items():
+        print(f"{name:<16}{result['seconds']:>10.4f}{result['items']:>8}{result['items_per_second']:>10}")
+
+    if args.output == "-":
+        print(json.dumps(report, indent=2))
+    elif args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(f"Slower than baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
@@ -0,0 +1,203 @@
+"""
+In-process stand-in for the Gmail API client used by the benchmarks.
+
+Every HTTP round trip (a single execute() or a whole batch) sleeps for
+`rtt` seconds plus `per_message` for each message it returns, so the
+sequential, pooled and batched fetch paths can be compared locally.
+"""
+import base64
+import os
+import time
+from email import message_from_bytes
+from email.message import EmailMessage
+
+
+def make_raw_message(index, html=False, attachment_bytes=0):
+    """
+    Base64url RFC 822 message: a plain-text placement mail, optionally with
+    an HTML alternative and a PDF attachment of attachment_bytes.
+    """
+    msg = EmailMessage()
+    msg["From"] = f"Placement Cell <placement{index % 7}@college.edu>"
+    msg["To"] = "student@college.edu"
+    msg["Subject"] = f"Campus drive #{index} - registration link inside"
+    text = (
+        f"Dear students,\n\nCompany {index} is hiring for the role of "
+        f"Software Engineer. Interview on 12 Mar 2030.\n" * 20
+    )
+    msg.set_content(text)
+    if html:
+        msg.add_alternative(f"<html><body><p>{text}</p></body></html>", subtype="html")
+    if attachment_bytes:
+        msg.add_attachment(
+            os.urandom(attachment_bytes),
+            maintype="application",
+            subtype="pdf",
+            filename=f"brochure{index}.pdf"
+        )
+    return base64.urlsafe_b64encode(msg.as_bytes()).decode()
+
+
+# Message shapes the fake mailbox can hold: make_raw_message options per kind
+MESSAGE_KINDS = {
+    "plain": {},
+    "html": {"html": True},
+    "attachment": {"html": True, "attachment_bytes": 64 * 1024},
+}
+
+
+def to_full_format(raw):
+    """Convert a raw message into the JSON tree Gmail returns for format='full'."""
+    def convert(part, part_id):
+        payload = part.get_payload(decode=True) or b""
+        node = {
+            "partId": part_id,
+            "mimeType": part.get_content_type(),
+            "filename": part.get_filename() or "",
+            "headers": [{"name": k, "value": str(v)} for k, v in part.items()],
+            "body": {"size": len(payload)},
+        }
+        if part.is_multipart():
+            node["parts"] = [
+                convert(child, f"{part_id}.{i}" if part_id else str(i))
+                for i, child in enumerate(part.get_payload())
+            ]
+        elif node["filename"]:
+            # Attachment bytes stay on the server
+            node["body"]["attachmentId"] = f"att-{part_id}"
+        else:
+            node["body"]["data"] = base64.urlsafe_b64encode(payload).decode()
+        return node
+
+    mime_msg = message_from_bytes(base64.urlsafe_b64decode(raw))
+    return convert(mime_msg, "")
+
+
+class _FakeRequest:
+    def __init__(self, service, handler):
+        self._service = service
+        self._handler = handler
+
+    def execute(self, http=None, num_retries=0):
+        result = self._handler()
+        self._service.round_trip(1)
+        return result
+
+
+class _FakeBatch:
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request_id, request, callback or self._callback))
+
+    def execute(self, http=None):
+        self._service.round_trip(len(self._requests))
+        for request_id, request, callback in self._requests:
+            callback(request_id, request._handler(), None)
+
+
+class _FakeHistory:
+    def __init__(self, service):
+        self._service = service
+
+    def list(self, userId, startHistoryId, historyTypes=None, labelId=None,
+             maxResults=100, pageToken=None):
+        def handler():
+            records = [
+                {"id": str(hid), "messagesAdded": [{"message": {"id": msg_id}}]}
+                for hid, msg_id in self._service.history_log
+                if hid > int(startHistoryId)
+            ]
+            start = int(pageToken or 0)
+            page = {
+                "history": records[start:start + maxResults],
+                "historyId": self._service.history_id
+            }
+            if start + maxResults < len(records):
+                page["nextPageToken"] = str(start + maxResults)
+            return page
+        return _FakeRequest(self._service, handler)
+
+
+class FakeGmailService:
+    """
+    A mailbox of `count` messages whose shapes cycle through `kinds`
+    (names from MESSAGE_KINDS).
+    """
+
+    def __init__(self, count, rtt=0.01, per_message=0.0002, kinds=("plain",)):
+        self.rtt = rtt
+        self.per_message = per_message
+        self.kinds = kinds
+        self.ids = []  # newest first, like messages().list
+        self.raw = {}
+        self.history_log = []  # (history_id, message_id), oldest first
+        self.round_trips = 0
+        self._responses = {}  # (message_id, format) -> messages().get response
+        self.add_messages(count)
+
+    def add_messages(self, count):
+        """Deliver `count` new messages to the inbox."""
+        for _ in range(count):
+            index = len(self.raw)
+            msg_id = f"msg{index:06d}"
+            kind = self.kinds[index % len(self.kinds)]
+            self.raw[msg_id] = make_raw_message(index, **MESSAGE_KINDS[kind])
+            self.ids.insert(0, msg_id)
+            self.history_log.append((index + 1, msg_id))
+
+    def preload(self, fmt):
+        """Build every get() response in fmt now, keeping fixture cost out of timed runs."""
+        for msg_id in self.raw:
+            self._response(msg_id, fmt)
+
+    def _response(self, msg_id, fmt):
+        key = (msg_id, fmt)
+        if key not in self._responses:
+            if fmt == 'full':
+                self._responses[key] = {"id": msg_id, "payload": to_full_format(self.raw[msg_id])}
+            else:
+                self._responses[key] = {"id": msg_id, "raw": self.raw[msg_id]}
+        return self._responses[key]
+
+    @property
+    def history_id(self):
+        return str(len(self.history_log))
+
+    def round_trip(self, messages):
+        self.round_trips += 1
+        time.sleep(self.rtt + self.per_message * messages)
+
+    # service.users().messages() chain
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def history(self):
+        return _FakeHistory(self)
+
+    def getProfile(self, userId):
+        return _FakeRequest(self, lambda: {
+            "emailAddress": "student@college.edu",
+            "historyId": self.history_id
+        })
+
+    def list(self, userId, labelIds=None, maxResults=100, pageToken=None, q=None):
+        def handler():
+            start = int(pageToken or 0)
+            page = {"messages": [{"id": i} for i in self.ids[start:start + maxResults]]}
+            if start + maxResults < len(self.ids):
+                page["nextPageToken"] = str(start + maxResults)
+            return page
+        return _FakeRequest(self, handler)
+
+    def get(self, userId, id, format='raw'):
+        return _FakeRequest(self, lambda: self._response(id, format))
+
+    def new_batch_http_request(self, callback=None):
+        return _FakeBatch(self, callback)
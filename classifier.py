@@ -1,41 +1,164 @@
+import os
+import multiprocessing
+from itertools import islice
+
+try:
+    import ahocorasick  # pyahocorasick: C automaton, optional
+except ImportError:
+    ahocorasick = None
+
+
+# -------- STRONG PLACEMENT INDICATORS --------
+STRONG_KEYWORDS = [
+    "job role", "job opportunity", "drive", "campus drive",
+    "interview", "shortlisted", "selection process",
+    "offer letter", "ctc", "package", "salary",
+    "joining", "recruitment", "hiring",
+    "registration link", "apply", "eligibility criteria",
+    "online test", "technical round", "hr round"
+]
+
+# -------- WEAK INDICATORS (NOT ENOUGH ALONE) --------
+WEAK_KEYWORDS = [
+    "placement coordinator",
+    "placement cell",
+    "training and placement",
+    "tpo",
+    "career guidance"
+]
+
+# -------- JOB CONTEXT THAT MAKES A WEAK MATCH COUNT --------
+CONTEXT_KEYWORDS = ["company", "drive", "interview", "apply", "registration", "job", "role"]
+
+# -------- NEGATIVE / NON-PLACEMENT INDICATORS --------
+NON_PLACEMENT_KEYWORDS = [
+    "meeting", "circular", "notice", "holiday",
+    "exam", "assignment", "attendance",
+    "seminar", "workshop", "fee",
+    "internal assessment", "class schedule"
+]
+
+RULES = {
+    "strong": STRONG_KEYWORDS,
+    "weak": WEAK_KEYWORDS,
+    "context": CONTEXT_KEYWORDS,
+    "non_placement": NON_PLACEMENT_KEYWORDS,
+}
+
+
+class KeywordMatcher:
+    """
+    Finds the keywords that occur in a text, with the semantics of
+    `keyword in text` for each keyword. With pyahocorasick one pass of a C
+    automaton finds them all; without it each keyword is one `in` scan, in
+    the order given.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for word in self.keywords:
+                self._automaton.add_word(word, word)
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+        self.single_pass = self._automaton is not None
+
+    def iter(self, text):
+        """Yield the keywords found in text, possibly more than once."""
+        if self._automaton is not None:
+            for _, word in self._automaton.iter(text):
+                yield word
+        else:
+            for word in self.keywords:
+                if word in text:
+                    yield word
+
+    def find_all(self, text):
+        return set(self.iter(text))
+
+
+_matcher = KeywordMatcher(word for words in RULES.values() for word in words)
+_STRONG = frozenset(STRONG_KEYWORDS)
+_WEAK = frozenset(WEAK_KEYWORDS)
+_CONTEXT = frozenset(CONTEXT_KEYWORDS)
+
+
+def match_rules(subject, body):
+    """Return {rule: [keywords found]} for every rule in RULES."""
+    found = _matcher.find_all(f"{subject} {body}".lower())
+    return {
+        rule: [word for word in words if word in found]
+        for rule, words in RULES.items()
+    }
+
+
+def classify_email_explained(subject, body):
+    """Return (category, rules) where rules lists the keyword hits per rule."""
+    rules = match_rules(subject, body)
+
+    # 1️⃣ If strong placement keywords found → Placement
+    if rules["strong"]:
+        return "Placement", rules
+
+    # 2️⃣ If weak keyword exists, only placement with job-related context
+    if rules["weak"]:
+        return ("Placement" if rules["context"] else "Other"), rules
+
+    # 3️⃣ Clearly non-placement, or nothing matched → Other
+    return "Other", rules
+
+
 def classify_email(subject, body):
+    """
+    Same category as classify_email_explained, without building the
+    per-rule lists: it stops as soon as a strong keyword turns up.
+    """
     text = f"{subject} {body}".lower()
 
-    strong_keywords = [
-        "job role", "job opportunity", "drive", "campus drive",
-        "interview", "shortlisted", "selection process",
-        "offer letter", "ctc", "package", "salary",
-        "joining", "recruitment", "hiring",
-        "registration link", "apply", "eligibility criteria",
-        "online test", "technical round", "hr round"
-    ]
-
-    weak_keywords = [
-        "placement coordinator",
-        "placement cell",
-        "training and placement",
-        "tpo",
-        "career guidance"
-    ]
-
-    non_placement_keywords = [
-        "meeting", "circular", "notice", "holiday",
-        "exam", "assignment", "attendance",
-        "seminar", "workshop", "fee"
-    ]
-
-    for word in strong_keywords:
-        if word in text:
-            return "Placement"
-
-    if any(w in text for w in weak_keywords):
-        for ctx in ["company", "drive", "interview", "apply", "job", "role"]:
-            if ctx in text:
+    if _matcher.single_pass:
+        weak = context = False
+        for word in _matcher.iter(text):
+            if word in _STRONG:
                 return "Placement"
-        return "Other"
-
-    for word in non_placement_keywords:
-        if word in text:
-            return "Other"
+            if word in _WEAK:
+                weak = True
+            if word in _CONTEXT:
+                context = True
+        return "Placement" if weak and context else "Other"
 
+    # One scan per keyword; non-placement keywords never change the category
+    if any(word in text for word in STRONG_KEYWORDS):
+        return "Placement"
+    if any(word in text for word in WEAK_KEYWORDS) and any(word in text for word in CONTEXT_KEYWORDS):
+        return "Placement"
     return "Other"
+
+
+def _classify_pair(item):
+    subject, body = item
+    return classify_email(subject, body)
+
+
+def classify_batch(items, processes=1, chunksize=256):
+    """
+    Classify an iterable of (subject, body) pairs, yielding categories in
+    input order. processes > 1 (or None for one per CPU) spreads the work
+    over a process pool. Input is consumed one window at a time, so memory
+    stays bounded however long the iterable is.
+    """
+    if processes == 1:
+        for subject, body in items:
+            yield classify_email(subject, body)
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        window_size = chunksize * (processes or os.cpu_count() or 1) * 2
+        items = iter(items)
+        while True:
+            window = list(islice(items, window_size))
+            if not window:
+                return
+            yield from pool.map(_classify_pair, window, chunksize)
@@ -0,0 +1,11 @@
+import pytest
+
+import db
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    """Point db.py at a fresh SQLite file for one test."""
+    monkeypatch.setattr(db, "DB_NAME", str(tmp_path / "emails.db"))
+    yield db.DB_NAME
+    db.close_db_connection()
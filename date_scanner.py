@@ -0,0 +1,174 @@
+import re
+from collections import namedtuple
+from datetime import date
+
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_MONTH = (
+    r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?"
+    r"|aug(?:ust)?|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b\.?"
+)
+_ORDINAL = r"(?:st|nd|rd|th)"
+
+# Every supported format in one alternation, so a text is scanned once
+DATE_PATTERN = re.compile(
+    rf"\b(?:"
+    rf"(?P<iso_y>\d{{4}})-(?P<iso_m>\d{{1,2}})-(?P<iso_d>\d{{1,2}})"
+    rf"|(?P<num_d>\d{{1,2}})[/.-](?P<num_m>\d{{1,2}})[/.-](?P<num_y>\d{{4}})"
+    rf"|(?P<dm_d>\d{{1,2}})(?P<dm_o>{_ORDINAL})?(?:\s+of)?[\s-]+(?P<dm_m>{_MONTH}),?(?:[\s-]+(?P<dm_y>\d{{4}}))?"
+    rf"|(?P<md_m>{_MONTH})\s+(?P<md_d>\d{{1,2}})(?P<md_o>{_ORDINAL})?\b(?:,?\s+(?P<md_y>\d{{4}}))?"
+    rf")(?!\d)",
+    re.IGNORECASE
+)
+
+# An optional weekday just before a date ("Monday, 12th March") is folded
+# into the mention; checking it after a hit keeps it out of the scan
+WEEKDAY_BEFORE = re.compile(
+    r"\b(?:mon|tue|tues|wed|thu|thur|thurs|fri|sat|sun)(?:day|nesday|rsday|urday|sday)?\.?,?\s+$",
+    re.IGNORECASE
+)
+
+# Words shortly before a date that say what the date is for. Whole words
+# only: "round" must not fire inside "around" or "background"
+EVENT_LABEL = re.compile(
+    r"\b(?:drives?|interviews?|assessments?|online tests?|written tests?|rounds?|hackathons?|walk-ins?"
+    r"|date of visit|reporting|exam date|test date)\b",
+    re.IGNORECASE
+)
+DEADLINE_LABEL = re.compile(
+    r"\b(?:deadline|last date|apply by|register by|registration (?:closes|ends)|closing date"
+    r"|on or before|before|due)\b",
+    re.IGNORECASE
+)
+LABEL_WINDOW = 60  # characters before a date searched for its label
+
+DateMention = namedtuple("DateMention", "date start end text label")
+
+
+def _resolve_year(month, day, today):
+    """Year-less dates take the occurrence nearest to today."""
+    candidates = []
+    for year in (today.year - 1, today.year, today.year + 1):
+        try:
+            candidates.append(date(year, month, day))
+        except ValueError:
+            pass
+    if not candidates:
+        return None
+    return min(candidates, key=lambda d: abs((d - today).days))
+
+
+def _to_date(match, today):
+    groups = match.groupdict()
+
+    if groups["iso_y"]:
+        year, month, day = groups["iso_y"], groups["iso_m"], groups["iso_d"]
+    elif groups["num_y"]:
+        year, month, day = groups["num_y"], groups["num_m"], groups["num_d"]
+    else:
+        prefix = "dm" if groups["dm_m"] else "md"
+        year = groups[f"{prefix}_y"]
+        month = MONTHS[groups[f"{prefix}_m"][:3].lower()]
+        day = groups[f"{prefix}_d"]
+        if not year:
+            return _resolve_year(month, int(day), today)
+
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def _is_bare_may(match):
+    """
+    "10 may" / "may 10" with no year and no ordinal: usually the verb
+    ("Top 10 may be shortlisted", "CGPA above 7 may apply"), not a date.
+    """
+    groups = match.groupdict()
+    prefix = "dm" if groups["dm_m"] else "md" if groups["md_m"] else None
+    if prefix is None or groups[f"{prefix}_y"] or groups[f"{prefix}_o"]:
+        return False
+    return groups[f"{prefix}_m"].rstrip(".").lower() == "may"
+
+
+def _label_for(text, start):
+    # Only look back to the start of the line
+    window = text[max(0, start - LABEL_WINDOW):start].rsplit("\n", 1)[-1]
+
+    event = [m.end() for m in EVENT_LABEL.finditer(window)]
+    deadline = [m.end() for m in DEADLINE_LABEL.finditer(window)]
+    if not event and not deadline:
+        return None
+
+    # The label nearest the date wins
+    return "deadline" if max(deadline, default=-1) > max(event, default=-1) else "event"
+
+
+def scan_dates(text, today=None):
+    """
+    Return every date mentioned in text as DateMention(date, start, end,
+    text, label), in text order. label is 'event' (interview/drive/...),
+    'deadline' (last date/apply by/...) or None. Dates without a year are
+    resolved relative to today.
+    """
+    today = today or date.today()
+    mentions = []
+
+    for match in DATE_PATTERN.finditer(text):
+        parsed = _to_date(match, today)
+        if not parsed:
+            continue
+
+        start = match.start()
+        weekday = WEEKDAY_BEFORE.search(text, max(0, start - 12), start)
+        if weekday:
+            start = weekday.start()
+
+        label = _label_for(text, start)
+        # A bare "may" only counts as a month next to a date label
+        if label is None and _is_bare_may(match):
+            continue
+
+        mentions.append(DateMention(parsed, start, match.end(), text[start:match.end()], label))
+
+    return mentions
+
+
+def rank_dates(mentions, today=None):
+    """
+    Pick the date a preparation roadmap should target:
+    the latest upcoming event date, else the first upcoming unlabelled date,
+    else the latest past event date (so a finished drive is recognised),
+    else the first unlabelled date, else the soonest upcoming deadline,
+    else the last deadline. Returns a DateMention or None.
+    """
+    today = today or date.today()
+
+    def pick(label, upcoming, choose):
+        candidates = [
+            m for m in mentions
+            if m.label == label and (upcoming is None or (m.date >= today) == upcoming)
+        ]
+        return choose(candidates) if candidates else None
+
+    latest = lambda ms: max(ms, key=lambda m: m.date)
+    first = lambda ms: ms[0]
+    soonest = lambda ms: min(ms, key=lambda m: m.date)
+
+    return (
+        pick("event", True, latest)
+        or pick(None, True, first)
+        or pick("event", None, latest)
+        or pick(None, None, first)
+        or pick("deadline", True, soonest)
+        or pick("deadline", None, latest)
+    )
+
+
+def best_date(text, today=None):
+    best = rank_dates(scan_dates(text, today), today)
+    return best.date if best else None
@@ -1,16 +1,189 @@
 import os
+import json
+import time
+import base64
+import html
 import sqlite3
+import threading
 from dotenv import load_dotenv
 
+from metrics import DB_QUERY_SECONDS
+from placement_facts import extract_placement_facts
+
 load_dotenv()
 
 DB_NAME = os.getenv('DB_NAME', 'emails.db') # Use a file for SQLite
 
+# Applied once to every new connection
+SQLITE_PRAGMAS = (
+    "PRAGMA busy_timeout = 5000",     # first, so the pragmas below wait for other processes' locks
+    "PRAGMA journal_mode = WAL",      # readers don't block the writer
+    "PRAGMA synchronous = NORMAL",    # safe with WAL, far fewer fsyncs
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",     # ~16 MB page cache
+)
+
+def timed_query(func):
+    """Record each call's duration under db_query_duration_seconds."""
+    return DB_QUERY_SECONDS.timed(backend="sqlite", query=func.__name__)(func)
+
+SNIPPET_LENGTH = 200  # characters of whitespace-collapsed body kept for listings
+
+def make_snippet(body):
+    return " ".join((body or "").split())[:SNIPPET_LENGTH]
+
+def _add_snippet_column(conn):
+    conn.execute("ALTER TABLE emails ADD COLUMN snippet TEXT")
+
+    # Backfill in chunks so large bodies are never all in memory at once
+    last_id = 0
+    while True:
+        rows = conn.execute("""
+            SELECT id, body FROM emails WHERE id > ? ORDER BY id LIMIT 1000
+        """, (last_id,)).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "UPDATE emails SET snippet = ? WHERE id = ?",
+            [(make_snippet(row["body"]), row["id"]) for row in rows]
+        )
+        last_id = rows[-1]["id"]
+
+    # Covering indexes: summary pages are served without touching table rows,
+    # so page reads no longer grow with body size
+    conn.execute("DROP INDEX IF EXISTS idx_emails_created")
+    conn.execute("DROP INDEX IF EXISTS idx_emails_category_created")
+    conn.execute("""
+        CREATE INDEX idx_emails_listing
+        ON emails (created_at, id, category, sender, subject, snippet)
+    """)
+    conn.execute("""
+        CREATE INDEX idx_emails_category_listing
+        ON emails (category, created_at, id, sender, subject, snippet)
+    """)
+
+FACT_COLUMNS = ("drive_date", "deadline", "company", "ctc")
+
+def _write_facts(conn, updates):
+    conn.executemany("""
+        UPDATE emails SET drive_date = ?, deadline = ?, company = ?, ctc = ? WHERE id = ?
+    """, ((*(facts[column] for column in FACT_COLUMNS), email_id) for email_id, facts in updates))
+
+def _add_fact_columns(conn):
+    for column in FACT_COLUMNS:
+        conn.execute(f"ALTER TABLE emails ADD COLUMN {column} TEXT")
+
+    last_id = 0
+    while True:
+        rows = conn.execute("""
+            SELECT id, subject, body FROM emails
+            WHERE id > ? AND category = 'Placement'
+            ORDER BY id LIMIT 1000
+        """, (last_id,)).fetchall()
+        if not rows:
+            break
+        _write_facts(conn, [
+            (row["id"], extract_placement_facts(row["subject"] or "", row["body"] or ""))
+            for row in rows
+        ])
+        last_id = rows[-1]["id"]
+
+    conn.execute("""
+        CREATE INDEX idx_emails_drive_date ON emails (category, drive_date, id)
+    """)
+
+# Schema changes applied in order after the base tables are created.
+# PRAGMA user_version records how many have already run on a database.
+MIGRATIONS = [
+    # 1: listing indexes so /emails pages don't scan and sort the table
+    (
+        "CREATE INDEX IF NOT EXISTS idx_emails_created ON emails (created_at, id)",
+        "CREATE INDEX IF NOT EXISTS idx_emails_category_created ON emails (category, created_at, id)",
+    ),
+    # 2: fixed-length snippet for summary listings
+    _add_snippet_column,
+    # 3: generated roadmaps keyed by a hash of everything that shapes the prompt
+    (
+        """
+        CREATE TABLE roadmap_cache (
+            cache_key TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX idx_roadmap_cache_access ON roadmap_cache (last_access)",
+    ),
+    # 4: placement facts extracted at ingest, so drives can be sorted in SQL
+    _add_fact_columns,
+    # 5: full-text index over subject/sender/body, kept in sync by triggers
+    (
+        """
+        CREATE VIRTUAL TABLE emails_fts USING fts5(
+            subject, sender, body,
+            content='emails', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2'
+        )
+        """,
+        """
+        CREATE TRIGGER emails_fts_insert AFTER INSERT ON emails BEGIN
+            INSERT INTO emails_fts (rowid, subject, sender, body)
+            VALUES (new.id, new.subject, new.sender, new.body);
+        END
+        """,
+        """
+        CREATE TRIGGER emails_fts_delete AFTER DELETE ON emails BEGIN
+            INSERT INTO emails_fts (emails_fts, rowid, subject, sender, body)
+            VALUES ('delete', old.id, old.subject, old.sender, old.body);
+        END
+        """,
+        # Category and fact updates don't touch the index
+        """
+        CREATE TRIGGER emails_fts_update AFTER UPDATE OF subject, sender, body ON emails BEGIN
+            INSERT INTO emails_fts (emails_fts, rowid, subject, sender, body)
+            VALUES ('delete', old.id, old.subject, old.sender, old.body);
+            INSERT INTO emails_fts (rowid, subject, sender, body)
+            VALUES (new.id, new.subject, new.sender, new.body);
+        END
+        """,
+        "INSERT INTO emails_fts (emails_fts) VALUES ('rebuild')",
+    ),
+]
+
+# One connection per thread and database. This only saves the connect and
+# PRAGMA setup under servers whose worker threads outlive a request (the
+# ASGI db_pool, gunicorn --threads); the Werkzeug dev server behind app.run
+# starts a thread per request, so there every request opens its own
+# connection, which is closed when the thread exits.
+_local = threading.local()
+
 def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row  # This allows accessing columns by name
+    """
+    Return this thread's connection to DB_NAME, opening it on first use.
+    Connections are reused across calls, so callers must not close them.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(DB_NAME)
+    if conn is None:
+        conn = sqlite3.connect(DB_NAME)
+        conn.row_factory = sqlite3.Row  # This allows accessing columns by name
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        connections[DB_NAME] = conn
+
     return conn
 
+def close_db_connection():
+    """Close every connection opened by the calling thread."""
+    connections = getattr(_local, "connections", {})
+    while connections:
+        _, conn = connections.popitem()
+        conn.close()
+
 def create_table_if_not_exists():
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -27,76 +200,257 @@ def create_table_if_not_exists():
         )
     """)
 
+    # Per-account Gmail historyId used by incremental sync
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            account TEXT PRIMARY KEY,
+            history_id TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    conn.commit()
+    cursor.close()
+
+    apply_migrations(conn)
+
+def apply_migrations(conn):
+    """
+    Run the migrations this database has not had yet, one transaction each.
+    Safe when several processes start at once: each migration takes the
+    write lock (BEGIN IMMEDIATE) before re-reading user_version, so a
+    migration another process has just applied is skipped, not re-run.
+    """
+    while conn.execute("PRAGMA user_version").fetchone()[0] < len(MIGRATIONS):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < len(MIGRATIONS):
+                migration = MIGRATIONS[version]
+                if callable(migration):
+                    migration(conn)
+                else:
+                    for statement in migration:
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+@timed_query
+def get_sync_cursor(account):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT history_id FROM sync_state WHERE account = ?
+    """, (account,))
+
+    row = cursor.fetchone()
+    cursor.close()
+
+    return row["history_id"] if row else None
+
+@timed_query
+def set_sync_cursor(account, history_id):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        INSERT INTO sync_state (account, history_id)
+        VALUES (?, ?)
+        ON CONFLICT(account) DO UPDATE SET
+            history_id = excluded.history_id,
+            updated_at = CURRENT_TIMESTAMP
+    """, (account, str(history_id)))
+
     conn.commit()
     cursor.close()
-    conn.close()
 
+@timed_query
+def find_existing_gmail_ids(gmail_ids):
+    """Return the subset of gmail_ids already stored, using one indexed lookup."""
+    if not gmail_ids:
+        return set()
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # json_each keeps this a single statement regardless of the variable limit
+    cursor.execute("""
+        SELECT gmail_id FROM emails
+        WHERE gmail_id IN (SELECT value FROM json_each(?))
+    """, (json.dumps(list(gmail_ids)),))
+
+    existing = {row["gmail_id"] for row in cursor.fetchall()}
+    cursor.close()
+
+    return existing
+
+@timed_query
 def insert_email(gmail_id, sender, subject, body, category):
     conn = get_db_connection()
     cursor = conn.cursor()
 
     try:
         cursor.execute("""
-            INSERT INTO emails (gmail_id, sender, subject, body, category)
-            VALUES (?, ?, ?, ?, ?)
-        """, (gmail_id, sender, subject, body, category))
+            INSERT INTO emails (gmail_id, sender, subject, body, category, snippet)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (gmail_id, sender, subject, body, category, make_snippet(body)))
         conn.commit()
     except sqlite3.IntegrityError:
-        pass # Duplicate gmail_id
-    
+        conn.rollback() # Duplicate gmail_id; don't leave the reused connection mid-transaction
+
     cursor.close()
-    conn.close()
 
-def fetch_stored_emails(category=None, limit=50):
+@timed_query
+def insert_emails(rows):
+    """
+    Insert many email dicts (gmail_id, sender, subject, body, category and
+    optionally the FACT_COLUMNS) in a single transaction, skipping duplicate
+    gmail_ids. Returns the number inserted.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
 
-    if category:
-        cursor.execute("""
-            SELECT id, sender, subject, body, category, created_at
-            FROM emails
-            WHERE category = ?
-            ORDER BY created_at DESC
-            LIMIT ?
-        """, (category, limit))
-    else:
-        cursor.execute("""
-            SELECT id, sender, subject, body, category, created_at
-            FROM emails
-            ORDER BY created_at DESC
+    with conn:
+        # rowcount leaves out rows written by the search index triggers
+        cursor = conn.executemany("""
+            INSERT OR IGNORE INTO emails (
+                gmail_id, sender, subject, body, category, snippet,
+                drive_date, deadline, company, ctc
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            (
+                row["gmail_id"], row["sender"], row["subject"], row["body"],
+                row["category"], make_snippet(row["body"]),
+                *(row.get(column) for column in FACT_COLUMNS)
+            )
+            for row in rows
+        ))
+
+    return cursor.rowcount
+
+def iter_emails_for_classification(chunk_size=1000):
+    """Yield (id, subject, body, category) rows in id order, one chunk per query."""
+    conn = get_db_connection()
+    last_id = 0
+
+    while True:
+        rows = conn.execute("""
+            SELECT id, subject, body, category FROM emails
+            WHERE id > ?
+            ORDER BY id
             LIMIT ?
-        """, (limit,))
+        """, (last_id, chunk_size)).fetchall()
 
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
+        if not rows:
+            return
 
-    emails = []
-    for row in rows:
-        emails.append({
-            "id": row["id"],
-            "sender": row["sender"],
-            "subject": row["subject"],
-            "body": row["body"],
-            "category": row["category"],
-            "created_at": row["created_at"]
-        })
+        yield from rows
+        last_id = rows[-1]["id"]
+
+@timed_query
+def update_categories(changes, facts=()):
+    """
+    Apply (email_id, category) pairs, plus (email_id, facts) for emails that
+    became Placement, in one transaction.
+    """
+    conn = get_db_connection()
+
+    with conn:
+        conn.executemany(
+            "UPDATE emails SET category = ? WHERE id = ?",
+            ((category, email_id) for email_id, category in changes)
+        )
+        _write_facts(conn, facts)
+
+def encode_page_cursor(sort_value, email_id):
+    raw = json.dumps([sort_value, email_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_page_cursor(cursor):
+    """Return (sort value, id) from an opaque cursor; ValueError if malformed."""
+    try:
+        sort_value, email_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # Sort columns are ISO timestamps/dates; NULL where a row has none
+        if sort_value is not None and not isinstance(sort_value, str):
+            raise TypeError(f"sort value {sort_value!r} is not a string")
+        return sort_value, int(email_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+LIST_COLUMNS = {
+    "summary": ("id", "sender", "subject", "snippet", "category", "created_at"),
+    "full": ("id", "sender", "subject", "body", "snippet", "category", "created_at"),
+}
+
+@timed_query
+def fetch_email_page(category=None, limit=50, cursor=None, view="summary"):
+    """
+    Keyset-paginated listing, newest first. Returns (emails, next_cursor);
+    next_cursor is None on the last page. Each page is an index range scan,
+    so its cost does not grow with how deep the caller has scrolled.
+
+    view="summary" omits the body; view="full" includes it.
+    """
+    columns = LIST_COLUMNS[view]
+    conditions = []
+    params = []
+
+    if category:
+        conditions.append("category = ?")
+        params.append(category)
+
+    if cursor:
+        conditions.append("(created_at, id) < (?, ?)")
+        params.extend(decode_page_cursor(cursor))
 
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = get_db_connection()
+    db_cursor = conn.cursor()
+
+    # Fetch one extra row to learn whether another page exists
+    db_cursor.execute(f"""
+        SELECT {', '.join(columns)}
+        FROM emails
+        {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    """, (*params, limit + 1))
+
+    rows = db_cursor.fetchall()
+    db_cursor.close()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_page_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    emails = [{column: row[column] for column in columns} for row in rows]
+
+    return emails, next_cursor
+
+def fetch_stored_emails(category=None, limit=50, view="summary"):
+    emails, _ = fetch_email_page(category=category, limit=limit, view=view)
     return emails
 
+@timed_query
 def fetch_email_by_id(email_id):
     conn = get_db_connection()
     cursor = conn.cursor()
 
     cursor.execute("""
-        SELECT id, sender, subject, body, category, created_at
+        SELECT id, sender, subject, body, category, created_at,
+               drive_date, deadline, company, ctc
         FROM emails
         WHERE id = ?
     """, (email_id,))
 
     row = cursor.fetchone()
     cursor.close()
-    conn.close()
 
     if not row:
         return None
@@ -107,6 +461,187 @@ def fetch_email_by_id(email_id):
         "subject": row["subject"],
         "body": row["body"],
         "category": row["category"],
-        "created_at": row["created_at"]
+        "created_at": row["created_at"],
+        "drive_date": row["drive_date"],
+        "deadline": row["deadline"],
+        "company": row["company"],
+        "ctc": row["ctc"]
     }
 
+@timed_query
+def fetch_upcoming_drives(from_date, limit=50, cursor=None):
+    """
+    Placement emails whose drive_date is on or after from_date (ISO date),
+    soonest first, keyset-paginated like fetch_email_page.
+    """
+    params = [from_date]
+    after = ""
+    if cursor:
+        after = "AND (drive_date, id) > (?, ?)"
+        params.extend(decode_page_cursor(cursor))
+
+    conn = get_db_connection()
+    rows = conn.execute(f"""
+        SELECT id, sender, subject, snippet, category, created_at,
+               drive_date, deadline, company, ctc
+        FROM emails
+        WHERE category = 'Placement' AND drive_date >= ? {after}
+        ORDER BY drive_date, id
+        LIMIT ?
+    """, (*params, limit + 1)).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_page_cursor(rows[-1]["drive_date"], rows[-1]["id"])
+
+    return [dict(row) for row in rows], next_cursor
+
+# Column weights for bm25(): a hit in the subject counts most
+SEARCH_WEIGHTS = (5.0, 2.0, 1.0)
+SNIPPET_TOKENS = 16
+_MARK_START, _MARK_END = "\x01", "\x02"  # snippet() sentinels, swapped for <mark> after escaping
+
+def _fts_query(text):
+    """
+    Turn free text into an FTS5 query: every word must match, as a phrase,
+    so user input can never be a syntax error. A trailing * keeps prefix search.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+def _highlight(snippet):
+    escaped = html.escape(snippet or "")
+    return escaped.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+@timed_query
+def search_emails(query, category=None, limit=20, offset=0):
+    """
+    Rank stored emails against query with bm25. Returns (emails, next_offset);
+    each email carries an HTML-safe `highlight` snippet with <mark>ed terms.
+    next_offset is None on the last page.
+    """
+    match = _fts_query(query)
+    if not match:
+        return [], None
+
+    params = [*SEARCH_WEIGHTS, match]
+    category_join = category_filter = ""
+    if category:
+        category_join = "JOIN emails e ON e.id = emails_fts.rowid"
+        category_filter = "AND e.category = ?"
+        params.append(category)
+
+    conn = get_db_connection()
+
+    # Rank first; the columns are only read for the rows on this page
+    rows = conn.execute(f"""
+        SELECT e.id, e.sender, e.subject, e.category, e.created_at, ranked.score
+        FROM (
+            SELECT emails_fts.rowid AS id, bm25(emails_fts, ?, ?, ?) AS score
+            FROM emails_fts
+            {category_join}
+            WHERE emails_fts MATCH ? {category_filter}
+            ORDER BY score, id DESC
+            LIMIT ? OFFSET ?
+        ) AS ranked
+        JOIN emails e ON e.id = ranked.id
+        ORDER BY ranked.score, e.id DESC
+    """, (*params, limit + 1, offset)).fetchall()
+
+    next_offset = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_offset = offset + limit
+
+    # snippet() is costly, so it runs for the page only rather than every match
+    highlights = dict(conn.execute("""
+        SELECT rowid, snippet(emails_fts, -1, ?, ?, '…', ?)
+        FROM emails_fts
+        WHERE emails_fts MATCH ? AND rowid IN (SELECT value FROM json_each(?))
+    """, (_MARK_START, _MARK_END, SNIPPET_TOKENS, match, json.dumps([row["id"] for row in rows]))).fetchall())
+
+    emails = []
+    for row in rows:
+        email = dict(row)
+        email["highlight"] = _highlight(highlights.get(row["id"]))
+        emails.append(email)
+
+    return emails, next_offset
+
+@timed_query
+def rebuild_search_index():
+    """Re-index every stored email from scratch and merge the index segments."""
+    conn = get_db_connection()
+    with conn:
+        conn.execute("INSERT INTO emails_fts (emails_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO emails_fts (emails_fts) VALUES ('optimize')")
+    return conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0]
+
+
+@timed_query
+def get_cached_roadmap(cache_key, ttl=None):
+    """Return the cached roadmap for cache_key, or None if absent or older than ttl seconds."""
+    conn = get_db_connection()
+    now = time.time()
+
+    row = conn.execute("""
+        SELECT payload, created_at FROM roadmap_cache WHERE cache_key = ?
+    """, (cache_key,)).fetchone()
+
+    if not row:
+        return None
+
+    with conn:
+        if ttl and now - row["created_at"] > ttl:
+            conn.execute("DELETE FROM roadmap_cache WHERE cache_key = ?", (cache_key,))
+            return None
+
+        conn.execute("""
+            UPDATE roadmap_cache SET last_access = ? WHERE cache_key = ?
+        """, (now, cache_key))
+
+    return json.loads(row["payload"])
+
+@timed_query
+def store_cached_roadmap(cache_key, roadmap, max_bytes=None):
+    """Cache a roadmap, then evict least recently used entries beyond max_bytes."""
+    conn = get_db_connection()
+    payload = json.dumps(roadmap)
+    now = time.time()
+
+    with conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO roadmap_cache (cache_key, payload, size, created_at, last_access)
+            VALUES (?, ?, ?, ?, ?)
+        """, (cache_key, payload, len(payload), now, now))
+
+        if max_bytes:
+            # Keep the most recently used entries that fit in max_bytes
+            conn.execute("""
+                DELETE FROM roadmap_cache WHERE cache_key IN (
+                    SELECT cache_key FROM (
+                        SELECT cache_key,
+                               SUM(size) OVER (ORDER BY last_access DESC, cache_key) AS running
+                        FROM roadmap_cache
+                    )
+                    WHERE running > ?
+                )
+            """, (max_bytes,))
+
+@timed_query
+def roadmap_cache_usage():
+    row = get_db_connection().execute("""
+        SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes FROM roadmap_cache
+    """).fetchone()
+    return {"entries": row["entries"], "bytes": row["bytes"]}
+
+def clear_roadmap_cache():
+    conn = get_db_connection()
+    with conn:
+        conn.execute("DELETE FROM roadmap_cache")
@@ -1,82 +1,506 @@
 import os
+import re
 import base64
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from email import message_from_bytes
-from bs4 import BeautifulSoup
+
+from html_text import html_to_text
+from metrics import GMAIL_MESSAGES, GMAIL_REQUEST_SECONDS
+
+# The Google auth and API client libraries are imported inside the functions
+# that need them, so importing this module (and app.py) stays cheap
 
 SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+TOKEN_FILE = os.getenv("GMAIL_TOKEN_FILE", "token.json")
+CREDENTIALS_FILE = os.getenv("GMAIL_CREDENTIALS_FILE", "credentials.json")
+# Use the discovery document bundled with google-api-python-client instead of fetching it
+STATIC_DISCOVERY = os.getenv("GMAIL_STATIC_DISCOVERY", "1") != "0"
 
+# Per-message gets are grouped into batch requests and run on a worker pool
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", 4))
+FETCH_BATCH_SIZE = int(os.getenv("FETCH_BATCH_SIZE", 50))
+MAX_BATCH_SIZE = 100  # Gmail API limit per batch request
+# Retries, with exponential backoff, of a single get on rate limits and 5xx errors
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", 5))
+MAX_PAGE_SIZE = 500  # Gmail API limit for messages().list / history().list
+
+# "full" returns the MIME tree as JSON with attachment bodies left on Gmail's
+# side; "raw" downloads and parses the whole RFC 822 message
+FETCH_FORMAT = os.getenv("GMAIL_FETCH_FORMAT", "full")
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", 256 * 1024))  # body text kept per email
+TEXT_TYPES = ("text/plain", "text/html")
+
+logger = logging.getLogger(__name__)
+
+_thread_local = threading.local()
+_service = None
+_saved_token = None
+_service_lock = threading.Lock()
+
+
+def _save_credentials(creds):
+    with open(TOKEN_FILE, 'w') as token:
+        token.write(creds.to_json())
+
+
+def load_credentials():
+    """
+    Return valid credentials from TOKEN_FILE, refreshing an expired access
+    token with the stored refresh token. The browser consent flow only runs
+    when there is no usable token at all.
+    """
+    import httplib2
+    from google.auth.exceptions import RefreshError
+    from google.oauth2.credentials import Credentials
+    from google_auth_httplib2 import Request as GoogleAuthRequest
+    from google_auth_oauthlib.flow import InstalledAppFlow
 
-def get_gmail_service():
     creds = None
 
-    if os.path.exists('token.json'):
-        creds = Credentials.from_authorized_user_file('token.json', SCOPES)
+    if os.path.exists(TOKEN_FILE):
+        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+
+    if creds and not creds.valid and creds.refresh_token:
+        try:
+            creds.refresh(GoogleAuthRequest(httplib2.Http()))
+            _save_credentials(creds)
+        except RefreshError:
+            creds = None  # Revoked or expired refresh token
 
     if not creds or not creds.valid:
         flow = InstalledAppFlow.from_client_secrets_file(
-            'credentials.json', SCOPES
+            CREDENTIALS_FILE, SCOPES
         )
         creds = flow.run_local_server(port=0)
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
+        _save_credentials(creds)
 
-    return build('gmail', 'v1', credentials=creds)
+    return creds
 
 
-def fetch_emails(service, from_email=None, label_ids=['INBOX'], max_results=5):
-    results = service.users().messages().list(
-        userId='me',
-        labelIds=label_ids,
-        maxResults=max_results
-    ).execute()
+def build_gmail_service(creds, static_discovery=STATIC_DISCOVERY):
+    """
+    Build a Gmail client whose requests each run on the calling thread's own
+    transport, so one client can be shared by every thread.
+    """
+    from googleapiclient.discovery import build
+    from googleapiclient.http import HttpRequest
 
-    messages = results.get('messages', [])
-    emails = []
+    def thread_safe_request(http, *args, **kwargs):
+        return HttpRequest(_thread_http(service) or http, *args, **kwargs)
 
-    for msg in messages:
-        msg_data = service.users().messages().get(
-            userId='me',
-            id=msg['id'],
-            format='raw'
-        ).execute()
+    service = build(
+        'gmail', 'v1',
+        credentials=creds,
+        requestBuilder=thread_safe_request,
+        static_discovery=static_discovery,
+        cache_discovery=False
+    )
+    return service
 
-        raw_data = base64.urlsafe_b64decode(msg_data['raw'])
-        mime_msg = message_from_bytes(raw_data)
 
-        subject = mime_msg.get('Subject', '')
-        sender = mime_msg.get('From', '')
+def get_gmail_service():
+    """
+    Return the process-wide Gmail client, building it on first use.
+    Access tokens are refreshed by the transport as they expire; refreshed
+    tokens are written back to TOKEN_FILE on the next call.
+    """
+    global _service, _saved_token
+
+    with _service_lock:
+        if _service is None:
+            creds = load_credentials()
+            _service = build_gmail_service(creds)
+            _saved_token = creds.token
+
+        creds = _service._http.credentials
+        if creds.token != _saved_token:
+            _save_credentials(creds)
+            _saved_token = creds.token
+
+        return _service
+
+
+def reset_gmail_service():
+    """Drop the cached client, e.g. after token.json was replaced."""
+    global _service
+    with _service_lock:
+        _service = None
+
+
+def _chunked(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _thread_http(service):
+    """
+    Return an authorized transport owned by the calling thread.
+    httplib2.Http is not thread-safe, so worker threads must not share
+    the one the service was built with.
+    """
+    base_http = getattr(service, '_http', None)
+    credentials = getattr(base_http, 'credentials', None)
+    if credentials is None:
+        return None
+
+    cache = getattr(_thread_local, 'http', None)
+    if cache is None:
+        cache = _thread_local.http = {}
+
+    if id(credentials) not in cache:
+        import httplib2
+        from google_auth_httplib2 import AuthorizedHttp
+        cache[id(credentials)] = AuthorizedHttp(credentials, http=httplib2.Http())
+    return cache[id(credentials)]
 
-        if from_email and from_email.lower() not in sender.lower():
-            continue
 
+def _get_single(service, message_ids, fmt, retries=FETCH_RETRIES):
+    """
+    Get messages one request at a time. A message that still fails after
+    `retries` retries is logged and left out rather than failing the rest.
+    Returns ({message_id: message}, [IDs that failed]).
+    """
+    from googleapiclient.errors import HttpError
+
+    http = _thread_http(service)
+    results = {}
+    failed = []
+
+    for msg_id in message_ids:
+        try:
+            with GMAIL_REQUEST_SECONDS.time(call="messages.get"):
+                results[msg_id] = service.users().messages().get(
+                    userId='me',
+                    id=msg_id,
+                    format=fmt
+                ).execute(http=http, num_retries=retries)
+        except HttpError as e:
+            # 404: deleted between listing and download
+            if e.resp.status != 404:
+                logger.warning("Skipping message %s: Gmail returned %s", msg_id, e.resp.status)
+                failed.append(msg_id)
+
+    return results, failed
+
+
+def _get_batch(service, message_ids, fmt):
+    results = {}
+    failed = []
+
+    def on_response(request_id, response, exception):
+        if exception is None:
+            results[request_id] = response
+        else:
+            failed.append(request_id)
+
+    batch = service.new_batch_http_request(callback=on_response)
+    for msg_id in message_ids:
+        batch.add(
+            service.users().messages().get(userId='me', id=msg_id, format=fmt),
+            request_id=msg_id
+        )
+    with GMAIL_REQUEST_SECONDS.time(call="batch"):
+        batch.execute(http=_thread_http(service))
+
+    # Gmail rate-limits individual parts of a batch; retry those one by one
+    if failed:
+        retried, failed = _get_single(service, failed, fmt)
+        results.update(retried)
+
+    return results, failed
+
+
+def download_messages(service, message_ids,
+                      concurrency=FETCH_CONCURRENCY,
+                      batch_size=FETCH_BATCH_SIZE,
+                      fmt=FETCH_FORMAT):
+    """
+    Download messages in the given Gmail format for the given IDs.
+
+    IDs are grouped into Gmail batch requests of up to `batch_size` parts
+    (batch_size <= 1 sends plain single gets) and the groups are spread over
+    at most `concurrency` worker threads. Returns ({message_id: message},
+    [IDs that still failed after retries]); deleted messages are in neither.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    chunks = list(_chunked(list(message_ids), batch_size))
+    fetch = _get_batch if batch_size > 1 else _get_single
+
+    if concurrency <= 1 or len(chunks) <= 1:
+        parts = [fetch(service, chunk, fmt) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(chunks))) as pool:
+            # Each worker runs in a copy of the caller's context, so its Gmail
+            # time counts towards the calling request (see metrics.start_request)
+            futures = [
+                pool.submit(contextvars.copy_context().run, fetch, service, chunk, fmt)
+                for chunk in chunks
+            ]
+            parts = [future.result() for future in futures]
+
+    messages = {}
+    failed = []
+    for part, part_failed in parts:
+        messages.update(part)
+        failed.extend(part_failed)
+    GMAIL_MESSAGES.inc(len(messages), format=fmt)
+    return messages, failed
+
+
+def _decode_text(payload, charset=None):
+    # Only the first MAX_BODY_BYTES are kept; a cut multi-byte char is dropped
+    payload = payload[:MAX_BODY_BYTES]
+    try:
+        return payload.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return payload.decode("utf-8", errors="ignore")
+
+
+def _email_dict(msg_id, subject, sender, plain, html):
+    if plain is not None:
+        body = plain
+    elif html is not None:
+        body = html_to_text(html)
+    else:
         body = ""
 
-        for part in mime_msg.walk():
-            content_type = part.get_content_type()
-            payload = part.get_payload(decode=True)
+    return {
+        "gmail_id": msg_id,
+        "subject": subject,
+        "from": sender,
+        "body": body.strip()
+    }
+
+
+def parse_raw_message(msg_id, msg_data, from_email=None):
+    """Decode a format='raw' message into the email dict, or None if filtered out."""
+    raw_data = base64.urlsafe_b64decode(msg_data['raw'])
+    mime_msg = message_from_bytes(raw_data)
+
+    subject = mime_msg.get('Subject', '')
+    sender = mime_msg.get('From', '')
+
+    if from_email and from_email.lower() not in sender.lower():
+        return None
+
+    plain = html = None
+
+    for part in mime_msg.walk():
+        # Attachments are never decoded, whatever their type
+        if part.get_content_type() not in TEXT_TYPES or part.get_content_disposition() == "attachment":
+            continue
+
+        payload = part.get_payload(decode=True)
+        if not payload:
+            continue
+
+        text = _decode_text(payload, part.get_content_charset())
+
+        if part.get_content_type() == "text/plain":
+            plain = text
+            break
+
+        if html is None:
+            html = text
+
+    return _email_dict(msg_id, subject, sender, plain, html)
+
+
+CHARSET_PATTERN = re.compile(r'charset="?([\w.:-]+)', re.IGNORECASE)
+
+
+def _decode_part_data(part):
+    data = part["body"]["data"]
+    # Decode only as much base64 as MAX_BODY_BYTES needs
+    data = data[:(MAX_BODY_BYTES // 3 + 1) * 4]
+    payload = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+    content_type = next(
+        (h["value"] for h in part.get("headers", []) if h["name"].lower() == "content-type"),
+        ""
+    )
+    charset = CHARSET_PATTERN.search(content_type)
+    return _decode_text(payload, charset.group(1) if charset else None)
+
+
+def parse_full_message(msg_id, msg_data, from_email=None):
+    """
+    Build the email dict from a format='full' message, or None if filtered
+    out. Attachment parts carry only an attachmentId in this format, so
+    their bytes are never downloaded.
+    """
+    payload = msg_data['payload']
+    headers = {h["name"].lower(): h["value"] for h in payload.get("headers", [])}
+
+    subject = headers.get('subject', '')
+    sender = headers.get('from', '')
+
+    if from_email and from_email.lower() not in sender.lower():
+        return None
+
+    plain = html = None
+    stack = [payload]
+
+    while stack:
+        part = stack.pop(0)
+
+        if part.get("parts"):
+            stack[:0] = part["parts"]
+            continue
+
+        if part.get("mimeType") not in TEXT_TYPES or part.get("filename"):
+            continue
+        if not part.get("body", {}).get("data"):
+            continue
+
+        if part["mimeType"] == "text/plain":
+            plain = _decode_part_data(part)
+            break
+
+        if html is None:
+            html = _decode_part_data(part)
 
-            if not payload:
-                continue
+    return _email_dict(msg_id, subject, sender, plain, html)
 
-            text = payload.decode(errors="ignore")
 
-            if content_type == "text/plain":
-                body = text
-                break
+def parse_message(msg_id, msg_data, from_email=None, fmt=FETCH_FORMAT):
+    """Parse a message downloaded in Gmail format `fmt` ('full' or 'raw')."""
+    parse = parse_full_message if fmt == "full" else parse_raw_message
+    return parse(msg_id, msg_data, from_email)
 
-            if content_type == "text/html" and not body:
-                body = BeautifulSoup(text, "html.parser").get_text()
 
-        emails.append({
-            "gmail_id": msg["id"],
-            "subject": subject,
-            "from": sender,
-            "body": body.strip()
-        })
+def get_profile(service):
+    """Return {'emailAddress': ..., 'historyId': ...} for the signed-in account."""
+    with GMAIL_REQUEST_SECONDS.time(call="getProfile"):
+        return service.users().getProfile(userId='me').execute()
+
+
+def iter_message_ids(service, label_ids=['INBOX'], max_results=None):
+    """
+    Yield up to `max_results` message IDs (newest first), requesting the next
+    messages().list page only once the previous one has been consumed;
+    max_results=None lists the whole label.
+    """
+    listed = 0
+    page_token = None
+
+    while max_results is None or listed < max_results:
+        page_size = MAX_PAGE_SIZE
+        if max_results is not None:
+            page_size = min(page_size, max_results - listed)
+
+        with GMAIL_REQUEST_SECONDS.time(call="messages.list"):
+            results = service.users().messages().list(
+                userId='me',
+                labelIds=label_ids,
+                maxResults=page_size,
+                pageToken=page_token
+            ).execute()
+
+        for msg in results.get('messages', []):
+            listed += 1
+            yield msg['id']
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+
+def list_message_ids(service, label_ids=['INBOX'], max_results=None):
+    return list(iter_message_ids(service, label_ids, max_results))
+
+
+def list_history_message_ids(service, start_history_id, label_ids=['INBOX']):
+    """
+    Return IDs of messages added to the label since `start_history_id`,
+    newest first, or None when Gmail no longer has history that old.
+    """
+    from googleapiclient.errors import HttpError
+
+    message_ids = []
+    seen = set()
+    page_token = None
+
+    while True:
+        try:
+            with GMAIL_REQUEST_SECONDS.time(call="history.list"):
+                results = service.users().history().list(
+                    userId='me',
+                    startHistoryId=start_history_id,
+                    historyTypes=['messageAdded'],
+                    labelId=label_ids[0] if label_ids else None,
+                    maxResults=MAX_PAGE_SIZE,
+                    pageToken=page_token
+                ).execute()
+        except HttpError as e:
+            if e.resp.status == 404:
+                return None
+            raise
+
+        for record in results.get('history', []):
+            for added in record.get('messagesAdded', []):
+                msg_id = added['message']['id']
+                if msg_id not in seen:
+                    seen.add(msg_id)
+                    message_ids.append(msg_id)
+
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+
+    message_ids.reverse()
+    return message_ids
+
+
+def list_new_message_ids(service, history_id=None, label_ids=['INBOX'], max_results=None):
+    """
+    Incremental listing: messages added since `history_id`, falling back to
+    the newest `max_results` messages on first sync or an expired cursor.
+    """
+    if history_id:
+        message_ids = list_history_message_ids(service, history_id, label_ids)
+        if message_ids is not None:
+            return message_ids
+
+    return list_message_ids(service, label_ids, max_results)
+
+
+def fetch_messages(service, message_ids, from_email=None,
+                   concurrency=FETCH_CONCURRENCY, batch_size=FETCH_BATCH_SIZE,
+                   fmt=FETCH_FORMAT):
+    messages, _ = download_messages(
+        service,
+        message_ids,
+        concurrency=concurrency,
+        batch_size=batch_size,
+        fmt=fmt
+    )
+    emails = []
+
+    for msg_id in message_ids:
+        if msg_id not in messages:
+            continue
+
+        email = parse_message(msg_id, messages[msg_id], from_email, fmt)
+        if email:
+            emails.append(email)
 
     return emails
 
 
+def fetch_emails(service, from_email=None, label_ids=['INBOX'], max_results=5,
+                 concurrency=FETCH_CONCURRENCY, batch_size=FETCH_BATCH_SIZE,
+                 fmt=FETCH_FORMAT):
+    message_ids = list_message_ids(service, label_ids, max_results)
+
+    return fetch_messages(
+        service,
+        message_ids,
+        from_email=from_email,
+        concurrency=concurrency,
+        batch_size=batch_size,
+        fmt=fmt
+    )
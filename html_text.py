@@ -0,0 +1,134 @@
+import os
+import re
+from html.parser import HTMLParser
+from importlib.util import find_spec
+
+# Optional backends are detected without importing them; each loads on first use
+HAVE_LXML = find_spec("lxml") is not None  # C parser
+HAVE_BS4 = find_spec("bs4") is not None
+
+
+# Elements whose text is never shown
+SKIP_TAGS = frozenset({"script", "style"})
+
+# Elements that start a new line of text
+BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4",
+    "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+    "table", "td", "th", "title", "tr", "ul",
+})
+
+_SPACES = re.compile(r"[^\S\n]+")
+_NEWLINES = re.compile(r"\s*\n\s*")
+
+
+def collapse_whitespace(text):
+    """Runs of spaces become one space; blank lines are dropped."""
+    return _NEWLINES.sub("\n", _SPACES.sub(" ", text)).strip()
+
+
+class _TextExtractor(HTMLParser):
+    """Collects text from parser events, never building a tree."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.chunks = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self.chunks.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.chunks.append(data)
+
+
+def fast_html_to_text(html):
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    return collapse_whitespace("".join(parser.chunks))
+
+
+def lxml_html_to_text(html):
+    from lxml import etree, html as lxml_html
+
+    if not html.strip():
+        return ""
+    # Without huge_tree libxml2 silently drops everything nested more than
+    # 256 elements deep. A parser per call: they are not safe to share
+    # between threads, and cost microseconds to build.
+    parser = lxml_html.HTMLParser(huge_tree=True)
+    try:
+        root = lxml_html.document_fromstring(html, parser=parser)
+    except (etree.ParserError, ValueError):
+        return fast_html_to_text(html)
+    # Even huge_tree stops at 2048 levels; the fast converter has no limit
+    if any(error.type == etree.ErrorTypes.ERR_RESOURCE_LIMIT for error in parser.error_log):
+        return fast_html_to_text(html)
+
+    chunks = []
+
+    def walk(element):
+        tag = element.tag if isinstance(element.tag, str) else None
+        if tag in SKIP_TAGS:
+            return
+        # Comments and processing instructions have no visible text
+        if tag is not None:
+            if tag in BLOCK_TAGS:
+                chunks.append("\n")
+            if element.text:
+                chunks.append(element.text)
+            for child in element:
+                walk(child)
+                if child.tail:
+                    chunks.append(child.tail)
+            if tag in BLOCK_TAGS:
+                chunks.append("\n")
+
+    try:
+        walk(root)
+    except RecursionError:
+        # Nested deeper than Python's recursion limit
+        return fast_html_to_text(html)
+    return collapse_whitespace("".join(chunks))
+
+
+def bs4_html_to_text(html):
+    # The original converter: a full html.parser tree per message
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+HTML_CONVERTERS = {"fast": fast_html_to_text}
+if HAVE_LXML:
+    HTML_CONVERTERS["lxml"] = lxml_html_to_text
+if HAVE_BS4:
+    HTML_CONVERTERS["bs4"] = bs4_html_to_text
+
+
+def get_html_converter(name=None):
+    """
+    Return the html -> text function registered as name (default: the
+    HTML_TO_TEXT env var, else 'lxml' when installed, else 'fast').
+    Unknown or unavailable backends fall back to the fast path.
+    """
+    name = name or os.getenv("HTML_TO_TEXT") or ("lxml" if HAVE_LXML else "fast")
+    return HTML_CONVERTERS.get(name, fast_html_to_text)
+
+
+html_to_text = get_html_converter()
@@ -0,0 +1,80 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ROADMAP_WORKERS = int(os.getenv("ROADMAP_WORKERS", 2))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", 15 * 60))
+
+
+class JobQueue:
+    """
+    Runs callables on a bounded thread pool and keeps their status and
+    result for polling. Submitting a key that is already queued or running
+    returns the existing job instead of starting another one.
+    """
+
+    def __init__(self, max_workers, retention=JOB_RETENTION_SECONDS, name="job"):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._retention = retention
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._in_flight = {}  # key -> job id
+
+    def submit(self, key, func, *args, **kwargs):
+        with self._lock:
+            self._prune()
+
+            job_id = self._in_flight.get(key)
+            if job_id:
+                return dict(self._jobs[job_id])
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "created_at": time.time(),
+                "finished_at": None
+            }
+            self._in_flight[key] = job_id
+            job = dict(self._jobs[job_id])
+
+        self._executor.submit(self._run, job_id, key, func, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _run(self, job_id, key, func, args, kwargs):
+        self._update(job_id, status="running")
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+        else:
+            self._update(job_id, status="done", result=result, finished_at=time.time())
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _prune(self):
+        # Forget finished jobs nobody has collected within the retention window
+        cutoff = time.time() - self._retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+roadmap_jobs = JobQueue(max_workers=ROADMAP_WORKERS, name="roadmap-job")
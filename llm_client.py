@@ -0,0 +1,349 @@
+import os
+import re
+import time
+import random
+import threading
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+from metrics import LLM_RATE_LIMITED, LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_TOKENS
+
+# Gemini free-tier flash quota is 15 requests/minute; raise for paid tiers
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", 15))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", 3))            # requests allowed back to back
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 4))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", 90))     # seconds per call, retries included
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 4))
+BACKOFF_BASE = 1.0   # seconds before the first retry, doubled each attempt
+BACKOFF_MAX = 30.0
+LATENCY_WINDOW = 500  # recent calls kept for latency percentiles
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+LLMResult = namedtuple("LLMResult", "text input_tokens output_tokens")
+
+
+class LLMError(Exception):
+    pass
+
+
+class RetryableError(LLMError):
+    """
+    A failure worth retrying: quota (status 429), overload or a timeout.
+    retry_after is the wait in seconds the API asked for, if it said.
+    """
+
+    def __init__(self, message, status=None, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class LLMTimeout(LLMError):
+    pass
+
+
+class TokenBucket:
+    """
+    Allows `rate` acquisitions per second on average and bursts of up to
+    `capacity`. acquire() blocks until a token is free or the deadline passes.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+
+            if deadline is not None and now + wait > deadline:
+                raise LLMTimeout("Deadline passed waiting for the rate limiter")
+            time.sleep(wait)
+
+
+# -------------------- BACKENDS --------------------
+class GeminiBackend:
+    """
+    google-genai models; raises RetryableError for quota, overload and
+    timeouts. The SDK is imported and the client built on the first call,
+    so constructing a backend costs nothing and needs no API key yet.
+    """
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                if not self.api_key:
+                    raise RuntimeError("GEMINI_API_KEY missing in .env file")
+                from google import genai
+                self._client = genai.Client(api_key=self.api_key)
+            return self._client
+
+    def _config(self, timeout):
+        from google.genai import types
+        return types.GenerateContentConfig(http_options=types.HttpOptions(timeout=int(timeout * 1000)))
+
+    def generate(self, model, prompt, timeout):
+        client = self._get_client()
+        with _gemini_errors():
+            response = client.models.generate_content(
+                model=model, contents=prompt, config=self._config(timeout)
+            )
+        return LLMResult(response.text or "", *_gemini_usage(response))
+
+    def stream(self, model, prompt, timeout):
+        """Yield text chunks, then one LLMResult with the token usage."""
+        client = self._get_client()
+        last = None
+        with _gemini_errors():
+            for chunk in client.models.generate_content_stream(
+                model=model, contents=prompt, config=self._config(timeout)
+            ):
+                if chunk.usage_metadata:
+                    last = chunk
+                yield chunk.text or ""
+        yield LLMResult("", *_gemini_usage(last))
+
+
+def _gemini_usage(response):
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return 0, 0
+    return usage.prompt_token_count or 0, usage.candidates_token_count or 0
+
+
+@contextmanager
+def _gemini_errors():
+    import httpx
+    from google.genai import errors
+
+    try:
+        yield
+    except errors.APIError as e:
+        if e.code not in RETRYABLE_STATUS:
+            raise
+        # 429s carry google.rpc.RetryInfo, e.g. "retryDelay": "12s"
+        delay = re.search(r"retryDelay\W+(\d+(?:\.\d+)?)s", str(e.details))
+        raise RetryableError(str(e), status=e.code, retry_after=float(delay.group(1)) if delay else None) from e
+    except httpx.TimeoutException as e:
+        raise RetryableError(f"Gemini request timed out: {e}", status=408) from e
+
+
+class FakeBackend:
+    """
+    Local stand-in for tests and benchmarks. Returns `response` (a string or
+    a callable taking the prompt) after `latency` seconds, split into
+    `chunks` pieces when streamed. Each call first pops `failures` and
+    raises the popped exception, if any.
+    """
+
+    def __init__(self, response="{}", latency=0.0, chunks=4, failures=()):
+        self.response = response
+        self.latency = latency
+        self.chunks = chunks
+        self.failures = deque(failures)
+        self.calls = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self, prompt, timeout):
+        with self._lock:
+            self.calls += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            failure = self.failures.popleft() if self.failures else None
+        try:
+            if self.latency > timeout:
+                time.sleep(timeout)
+                raise RetryableError("Fake backend timed out", status=408)
+            time.sleep(self.latency)
+            if failure is not None:
+                raise failure
+            text = self.response(prompt) if callable(self.response) else self.response
+            return LLMResult(text, len(prompt) // 4, len(text) // 4)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def generate(self, model, prompt, timeout):
+        return self._call(prompt, timeout)
+
+    def stream(self, model, prompt, timeout):
+        result = self._call(prompt, timeout)
+        size = max(1, -(-len(result.text) // self.chunks))
+        for i in range(0, len(result.text), size):
+            yield result.text[i:i + size]
+        yield result._replace(text="")
+
+
+# -------------------- CLIENT --------------------
+class LLMClient:
+    """
+    Shared entry point for model calls. Every attempt waits for the rate
+    limiter and a concurrency slot; RetryableError is retried with
+    exponential backoff and full jitter; a call fails with LLMTimeout once
+    its deadline (timeout seconds from the call, retries included) passes.
+    """
+
+    def __init__(self, backend, model,
+                 requests_per_minute=GEMINI_RPM, burst=GEMINI_BURST,
+                 max_concurrency=GEMINI_MAX_CONCURRENCY, timeout=GEMINI_TIMEOUT,
+                 max_retries=GEMINI_MAX_RETRIES, backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.backend = backend
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._bucket = TokenBucket(requests_per_minute / 60.0, burst)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._metrics = {
+            "calls": 0, "succeeded": 0, "failed": 0, "retries": 0,
+            "rate_limited": 0, "timeouts": 0, "input_tokens": 0, "output_tokens": 0,
+        }
+
+    def generate(self, prompt, timeout=None):
+        """Return the model's text for prompt."""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        started = time.monotonic()
+
+        with self._tracked():
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with self._slot(deadline):
+                        result = self.backend.generate(self.model, prompt, self._remaining(deadline))
+                except RetryableError as e:
+                    self._backoff(e, attempt, deadline)
+                    continue
+
+                self._record_success(started, result)
+                return result.text
+
+    def stream(self, prompt, timeout=None):
+        """
+        Yield the model's text in chunks. A call is only retried before its
+        first chunk arrives; later failures reach the caller.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        started = time.monotonic()
+
+        with self._tracked():
+            for attempt in range(self.max_retries + 1):
+                received = False
+                try:
+                    with self._slot(deadline):
+                        for piece in self.backend.stream(self.model, prompt, self._remaining(deadline)):
+                            if isinstance(piece, LLMResult):
+                                self._record_success(started, piece)
+                            else:
+                                received = True
+                                yield piece
+                    return
+                except RetryableError as e:
+                    if received:
+                        raise
+                    self._backoff(e, attempt, deadline)
+
+    def metrics(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 3)
+
+        metrics["latency_p50"] = percentile(0.50)
+        metrics["latency_p95"] = percentile(0.95)
+        return metrics
+
+    @contextmanager
+    def _tracked(self):
+        self._count("calls")
+        started = time.perf_counter()
+        outcome = "abandoned"  # a stream closed early by its consumer
+        try:
+            yield
+            outcome = "ok"
+        except LLMTimeout:
+            outcome = "timeout"
+            self._count("timeouts")
+            self._count("failed")
+            raise
+        except Exception:
+            outcome = "error"
+            self._count("failed")
+            raise
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, model=self.model, outcome=outcome)
+
+    @contextmanager
+    def _slot(self, deadline):
+        self._bucket.acquire(deadline)
+        if not self._slots.acquire(timeout=self._remaining(deadline)):
+            raise LLMTimeout("Deadline passed waiting for a free model slot")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _remaining(deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMTimeout("Model call deadline passed")
+        return remaining
+
+    def _backoff(self, error, attempt, deadline):
+        """Sleep before the next attempt, or raise when out of attempts or time."""
+        if error.status == 429:
+            self._count("rate_limited")
+            LLM_RATE_LIMITED.inc(model=self.model)
+
+        if attempt >= self.max_retries:
+            raise error
+
+        # Full jitter, but never sooner than the server asked for
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        delay = max(delay, error.retry_after or 0)
+
+        if time.monotonic() + delay >= deadline:
+            raise LLMTimeout(f"Model call deadline passed while retrying: {error}") from error
+
+        self._count("retries")
+        LLM_RETRIES.inc(model=self.model)
+        time.sleep(delay)
+
+    def _record_success(self, started, result):
+        with self._lock:
+            self._metrics["succeeded"] += 1
+            self._metrics["input_tokens"] += result.input_tokens
+            self._metrics["output_tokens"] += result.output_tokens
+            self._latencies.append(time.monotonic() - started)
+        LLM_TOKENS.inc(result.input_tokens, model=self.model, direction="input")
+        LLM_TOKENS.inc(result.output_tokens, model=self.model, direction="output")
+
+    def _count(self, metric):
+        with self._lock:
+            self._metrics[metric] += 1
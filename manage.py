@@ -0,0 +1,117 @@
+"""
+Maintenance commands for the local email database.
+
+    python manage.py ingest [--backend sqlite|postgres] [--mode incremental|recent] [--max N]
+    python manage.py reclassify [--processes N] [--chunk-size N]
+    python manage.py clear-roadmap-cache
+    python manage.py rebuild-search
+"""
+import argparse
+import time
+from itertools import tee
+
+import db
+from classifier import classify_batch
+from gmail_service import get_gmail_service
+from pipeline import STAGES, PipelineStats, get_storage_backend, ingest
+from placement_facts import extract_placement_facts
+
+
+def run_ingest_command(backend="sqlite", sync_mode="incremental", max_results=None, from_email=None):
+    """Sync Gmail into the chosen backend, printing each email as it is stored."""
+    store = get_storage_backend(backend)
+    store.create_table_if_not_exists()
+    stats = PipelineStats()
+
+    rows = ingest(
+        get_gmail_service(),
+        store=store,
+        sync_mode=sync_mode,
+        from_email=from_email,
+        max_results=max_results,
+        stats=stats
+    )
+    for row in rows:
+        print(f"[{row['category']}] {row['subject']}")
+
+    counts = stats.counts
+    print(f"Listed {counts['listed']}, {counts['skipped']} already stored, {counts['stored']} stored")
+    print("  ".join(f"{stage} {stats.seconds[stage]:.2f}s" for stage in STAGES))
+
+
+def reclassify(processes=None, chunk_size=1000):
+    """Re-run classify_email over every stored email and save changed categories."""
+    db.create_table_if_not_exists()
+
+    rows_for_ids, rows_for_text = tee(db.iter_emails_for_classification(chunk_size))
+    categories = classify_batch(
+        ((row["subject"], row["body"]) for row in rows_for_text),
+        processes=processes
+    )
+
+    scanned = 0
+    changes = []
+    facts = []
+    changed = 0
+    start = time.perf_counter()
+
+    for row, category in zip(rows_for_ids, categories):
+        scanned += 1
+
+        if category != row["category"]:
+            changes.append((row["id"], category))
+            if category == "Placement":
+                facts.append((row["id"], extract_placement_facts(row["subject"], row["body"])))
+
+        if len(changes) >= chunk_size:
+            db.update_categories(changes, facts)
+            changed += len(changes)
+            changes = []
+            facts = []
+
+        if scanned % (chunk_size * 10) == 0:
+            elapsed = time.perf_counter() - start
+            print(f"{scanned} scanned, {changed + len(changes)} changed, {scanned / elapsed:.0f} emails/sec")
+
+    db.update_categories(changes, facts)
+    changed += len(changes)
+
+    elapsed = time.perf_counter() - start
+    rate = scanned / elapsed if elapsed else 0
+    print(f"Reclassified {scanned} emails in {elapsed:.1f}s ({rate:.0f} emails/sec), {changed} changed")
+    return scanned, changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest_cmd = commands.add_parser("ingest", help="fetch, classify and store new Gmail messages")
+    ingest_cmd.add_argument("--backend", choices=["sqlite", "postgres"], default="sqlite")
+    ingest_cmd.add_argument("--mode", choices=["incremental", "recent"], default="incremental",
+                            help="only mail added since the last sync, or the newest --max messages")
+    ingest_cmd.add_argument("--max", type=int, default=None, help="messages listed on a first or recent sync (default: all)")
+    ingest_cmd.add_argument("--from", dest="from_email", default=None, help="only keep mail from this sender")
+
+    reclassify_cmd = commands.add_parser("reclassify", help="re-categorize stored emails after keyword changes")
+    reclassify_cmd.add_argument("--processes", type=int, default=None, help="worker processes (default: one per CPU)")
+    reclassify_cmd.add_argument("--chunk-size", type=int, default=1000, help="rows read and written per transaction")
+
+    commands.add_parser("clear-roadmap-cache", help="drop every cached Gemini roadmap")
+    commands.add_parser("rebuild-search", help="re-index every stored email for /emails/search")
+
+    args = parser.parse_args()
+
+    if args.command == "ingest":
+        run_ingest_command(args.backend, args.mode, args.max, args.from_email)
+    elif args.command == "reclassify":
+        reclassify(processes=args.processes, chunk_size=args.chunk_size)
+    elif args.command == "clear-roadmap-cache":
+        db.create_table_if_not_exists()
+        db.clear_roadmap_cache()
+        print("Roadmap cache cleared")
+    elif args.command == "rebuild-search":
+        db.create_table_if_not_exists()
+        start = time.perf_counter()
+        indexed = db.rebuild_search_index()
+        print(f"Indexed {indexed} emails in {time.perf_counter() - start:.1f}s")
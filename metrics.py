@@ -0,0 +1,237 @@
+"""
+Process-wide counters and latency histograms, rendered in the Prometheus
+text format for the /metrics endpoint, plus per-request timing logs.
+
+Set REQUEST_LOG=1 to log one JSON line per HTTP request (logger "requests")
+with its status, duration and the time it spent in Gmail, storage and Gemini.
+"""
+import os
+import json
+import time
+import bisect
+import logging
+import functools
+import threading
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+
+REQUEST_LOG = os.getenv("REQUEST_LOG") == "1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; shared by every histogram
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+request_logger = logging.getLogger("requests")
+
+_registry = []
+_spans_lock = threading.Lock()
+# Per-request {span: seconds}; set while an HTTP request is being served
+_request_spans = contextvars.ContextVar("request_spans", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    # repr keeps every digit; :g would turn 1234567 into 1.23457e+06
+    return repr(float(value))
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values = defaultdict(float)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] += amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram(_Metric):
+    """
+    Latency histogram. A histogram with a span also adds each observation
+    to the current request's timing breakdown (see start_request).
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS, span=None):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        self.span = span
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        self._observe(self._key(labels), value)
+
+    def _observe(self, key, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+        if self.span:
+            spans = _request_spans.get()
+            if spans is not None:
+                with _spans_lock:
+                    spans[self.span] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def timed(self, **labels):
+        """Decorator observing the duration of each call; cheaper than time() on hot paths."""
+        key = self._key(labels)
+
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._observe(key, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def _samples(self):
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+
+        lines = []
+        for key, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', f'{bound:g}')])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, [('le', '+Inf')])} {values[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {values[-1]}")
+        return lines
+
+
+def render():
+    """Every registered metric in the Prometheus text exposition format."""
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# -------------------- REQUEST TIMING --------------------
+if REQUEST_LOG and not request_logger.handlers:
+    # Log lines must show up whatever logging setup the server has
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    request_logger.addHandler(_handler)
+    request_logger.setLevel(logging.INFO)
+    request_logger.propagate = False
+
+
+def start_request():
+    """
+    Start timing an HTTP request; pass the result to finish_request. Until
+    then, observations of histograms with a span are added up per span.
+    Work on other threads only counts when it runs in a copy of the
+    request's context (contextvars.copy_context).
+    """
+    return time.perf_counter(), _request_spans.set(defaultdict(float))
+
+
+def finish_request(timing, method, path, endpoint, status):
+    started, token = timing
+    seconds = time.perf_counter() - started
+    spans = _request_spans.get() or {}
+    _request_spans.reset(token)
+
+    HTTP_REQUEST_SECONDS.observe(seconds, method=method, endpoint=endpoint or "unmatched", status=status)
+    if REQUEST_LOG:
+        request_logger.info(json.dumps({
+            "method": method,
+            "path": path,
+            "endpoint": endpoint,
+            "status": status,
+            "seconds": round(seconds, 4),
+            # Summed over threads, so parallel Gmail downloads can exceed `seconds`
+            **{f"{span}_seconds": round(value, 4) for span, value in sorted(spans.items())}
+        }))
+
+
+# -------------------- METRICS --------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "endpoint", "status")
+)
+
+INGEST_STAGE_SECONDS = Histogram(
+    "ingest_stage_duration_seconds", "Time one ingest run spent in each pipeline stage", ("stage",)
+)
+INGEST_ITEMS = Counter(
+    "ingest_items_total", "Messages through each ingest step (listed, skipped, fetched, failed, parsed, stored)", ("step",)
+)
+
+GMAIL_REQUEST_SECONDS = Histogram(
+    "gmail_request_duration_seconds", "Gmail API round trip latency", ("call",), span="gmail"
+)
+GMAIL_MESSAGES = Counter("gmail_messages_downloaded_total", "Messages downloaded from Gmail", ("format",))
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Storage call latency", ("backend", "query"), span="db"
+)
+
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "Model call latency, retries included", ("model", "outcome"), span="llm"
+)
+LLM_RETRIES = Counter("llm_retries_total", "Model call attempts retried", ("model",))
+LLM_RATE_LIMITED = Counter("llm_rate_limited_total", "Model responses with status 429", ("model",))
+LLM_TOKENS = Counter("llm_tokens_total", "Model tokens used", ("model", "direction"))
+
+ROADMAP_CACHE_LOOKUPS = Counter("roadmap_cache_lookups_total", "Roadmap cache lookups", ("result",))
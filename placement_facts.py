@@ -0,0 +1,54 @@
+import re
+
+from date_scanner import rank_dates, scan_dates
+
+
+# -------------------- COMPANY / CTC --------------------
+COMPANY_PATTERNS = [
+    re.compile(r"(?:company|organi[sz]ation|employer|recruiter)(?:\s+name)?\s*[:\-–]\s*([^\n|,]{2,80})", re.IGNORECASE),
+    re.compile(r"\b([A-Z][\w&.]*(?:\s+[A-Z][\w&.]*){0,4})\s+(?:is hiring|is recruiting|campus drive|off[- ]campus drive|hiring drive)"),
+]
+CTC_PATTERN = re.compile(
+    r"(?:ctc|package|salary|stipend)\s*(?:of|is|:|-|–|upto|up to)*\s*"
+    r"((?:rs\.?|inr|₹)?\s*\d[\d,.]*\s*(?:(?:-|to|–)\s*\d[\d,.]*\s*)?(?:lpa|lakhs?|lacs?|k|per annum|p\.a\.|/month|per month)?)",
+    re.IGNORECASE
+)
+
+
+def extract_company(subject, body):
+    for text in (body, subject):
+        for pattern in COMPANY_PATTERNS:
+            match = pattern.search(text)
+            if match:
+                return match.group(1).strip(" .:-–")
+    return None
+
+
+def extract_ctc(text):
+    match = CTC_PATTERN.search(text)
+    return " ".join(match.group(1).split()) if match else None
+
+
+# -------------------- FACTS --------------------
+def extract_placement_facts(subject, body):
+    """
+    Structured facts for a placement email: drive_date and deadline as
+    ISO dates, company and ctc as short strings. Missing facts are None.
+    """
+    text = f"{subject}\n{body}"
+    dates = scan_dates(text)
+
+    # Same choice as roadmap.extract_target_date (date_scanner.rank_dates), minus
+    # its deadline fallback: a deadline alone is not a drive date
+    drive = rank_dates([m for m in dates if m.label != "deadline"])
+    drive_date = drive.date if drive else None
+
+    deadlines = [m.date for m in dates if m.label == "deadline"]
+    deadline = min(deadlines) if deadlines else None
+
+    return {
+        "drive_date": drive_date.isoformat() if drive_date else None,
+        "deadline": deadline.isoformat() if deadline else None,
+        "company": extract_company(subject, body),
+        "ctc": extract_ctc(text)
+    }
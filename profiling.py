@@ -0,0 +1,233 @@
+"""
+Opt-in profiling of single requests. Start the app with PROFILING=1, then
+send a request with an `X-Profile` header or `profile` query parameter:
+
+    curl -X POST -H "X-Profile: cprofile" localhost:5000/fetch-emails
+    curl -X POST "localhost:5000/roadmap/generate/3?profile=sample"
+
+cprofile writes a .pstats file (snakeviz, `python -m pstats`); sample takes a
+stack sample every PROFILE_SAMPLE_INTERVAL seconds and writes a .collapsed
+file (one `frame;frame;frame count` line per stack, for flamegraph.pl or
+speedscope). A roadmap job submitted by a profiled request is profiled too,
+in its worker thread. GET /admin/profiles lists the recent profiles.
+
+Without PROFILING=1 no hooks or routes are installed at all.
+"""
+import os
+import re
+import sys
+import time
+import uuid
+import pstats
+import cProfile
+import threading
+import contextvars
+from collections import Counter, deque, namedtuple
+from functools import wraps
+from io import StringIO
+
+PROFILING = os.getenv("PROFILING") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 50))  # newest profiles kept on disk
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))  # seconds
+
+MODES = {"cprofile": "pstats", "sample": "collapsed"}  # mode -> file extension
+
+_lock = threading.Lock()
+_recent = deque()  # profile records, oldest first
+# Mode of the profile running for the current request, if any
+_active_mode = contextvars.ContextVar("active_profile_mode", default=None)
+
+ProfileSession = namedtuple("ProfileSession", "id mode profiler started token")
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack from a background thread every `interval`
+    seconds and counts identical stacks. The profiled thread itself runs
+    untouched, so the overhead stays flat however hot its code is.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def requested_mode(value):
+    """Mode for an X-Profile header or profile query value; any other truthy value means cprofile."""
+    if not value or value == "0":
+        return None
+    return value if value in MODES else "cprofile"
+
+
+def start(mode):
+    """
+    Start profiling the calling thread; pass the result to finish. Returns
+    None when no profile can be taken (cProfile allows one active profiler
+    per process on Python 3.12+).
+    """
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None
+    else:
+        profiler = SamplingProfiler(threading.get_ident())
+        profiler.start()
+    return ProfileSession(
+        f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}",
+        mode, profiler, time.perf_counter(), _active_mode.set(mode)
+    )
+
+
+def finish(session, label, **details):
+    """Stop the profile, write it to PROFILE_DIR and return its record."""
+    profile_id, mode, profiler, started, token = session
+    if mode == "cprofile":
+        profiler.disable()
+    else:
+        profiler.stop()
+    seconds = time.perf_counter() - started
+    _active_mode.reset(token)
+
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", label).strip("-")[:60]
+    filename = f"{profile_id}-{slug}.{MODES[mode]}"
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, filename)
+    if mode == "cprofile":
+        profiler.dump_stats(path)
+    else:
+        profiler.dump(path)
+
+    record = {
+        "id": profile_id,
+        "file": filename,
+        "mode": mode,
+        "label": label,
+        "seconds": round(seconds, 4),
+        "created_at": time.time(),
+        **details
+    }
+    with _lock:
+        _recent.append(record)
+        expired = [_recent.popleft() for _ in range(max(0, len(_recent) - PROFILE_KEEP))]
+    for old in expired:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, old["file"]))
+        except FileNotFoundError:
+            pass
+    return record
+
+
+def recent_profiles():
+    with _lock:
+        return list(reversed(_recent))
+
+
+def find_profile(profile_id):
+    with _lock:
+        return next((record for record in _recent if record["id"] == profile_id), None)
+
+
+def top_functions(path, limit=40, sort="cumulative"):
+    """Text summary of a .pstats file, like `python -m pstats` would print."""
+    out = StringIO()
+    pstats.Stats(path, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def profile_job(func, label):
+    """
+    func, profiled in whichever thread runs it, when called while the
+    current request is being profiled; otherwise func unchanged.
+    """
+    mode = _active_mode.get() if PROFILING else None
+    if mode is None:
+        return func
+
+    @wraps(func)
+    def profiled(*args, **kwargs):
+        session = start(mode)
+        if session is None:
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            finish(session, label, kind="job")
+    return profiled
+
+
+def init_app(app):
+    """Install the Flask request hooks and /admin/profiles routes."""
+    from flask import abort, g, jsonify, request, send_from_directory
+
+    @app.before_request
+    def start_request_profile():
+        mode = requested_mode(request.headers.get("X-Profile") or request.args.get("profile"))
+        if mode:
+            g.profile_session = start(mode)
+
+    @app.after_request
+    def tag_profiled_response(response):
+        # The profile itself is finished in teardown, once the response is known
+        if g.get("profile_session") is not None:
+            g.profile_status = response.status_code
+            response.headers["X-Profile-Id"] = g.profile_session.id
+        return response
+
+    @app.teardown_request
+    def finish_request_profile(error=None):
+        # Runs even when the view raised, so a failing request never leaves
+        # the sampler thread or the process-wide cProfile hook running
+        session = g.pop("profile_session", None)
+        if session is not None:
+            details = {"kind": "request", "method": request.method, "path": request.full_path.rstrip("?")}
+            if "profile_status" in g:
+                details["status"] = g.pop("profile_status")
+            if error is not None:
+                details["error"] = repr(error)
+            finish(session, f"{request.method} {request.path}", **details)
+
+    @app.route("/admin/profiles", methods=["GET"])
+    def list_profiles():
+        profiles = recent_profiles()
+        return jsonify({"count": len(profiles), "profiles": profiles})
+
+    @app.route("/admin/profiles/<profile_id>", methods=["GET"])
+    def get_profile_file(profile_id):
+        record = find_profile(profile_id)
+        if not record:
+            abort(404)
+        # ?view=text prints the top functions of a cProfile run
+        if request.args.get("view") == "text" and record["mode"] == "cprofile":
+            text = top_functions(os.path.join(PROFILE_DIR, record["file"]), sort=request.args.get("sort", "cumulative"))
+            return text, 200, {"Content-Type": "text/plain; charset=utf-8"}
+        return send_from_directory(os.path.abspath(PROFILE_DIR), record["file"], as_attachment=True)
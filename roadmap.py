@@ -1,9 +1,15 @@
 import os
 import re
 import json
+import hashlib
+import threading
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from google import genai
+
+from date_scanner import best_date
+from db import get_cached_roadmap, store_cached_roadmap, roadmap_cache_usage
+from llm_client import GeminiBackend, LLMClient
+from metrics import ROADMAP_CACHE_LOOKUPS
 
 
 
@@ -11,33 +17,52 @@ from google import genai
 load_dotenv()
 
 API_KEY = os.getenv("GEMINI_API_KEY")
-if not API_KEY:
-    raise RuntimeError("GEMINI_API_KEY missing in .env file")
-
-client = genai.Client(api_key=API_KEY)
 
 # Quota-safe model
 MODEL_NAME = "models/gemini-flash-latest"
 
+# Rate-limited, retrying access to the model (see llm_client for the knobs).
+# The Gemini SDK is only loaded, and a missing GEMINI_API_KEY only reported,
+# when the first roadmap is generated.
+llm = LLMClient(GeminiBackend(API_KEY), MODEL_NAME)
+
+# -------------------- ROADMAP CACHE --------------------
+ROADMAP_CACHE_TTL = int(os.getenv("ROADMAP_CACHE_TTL", 24 * 60 * 60))  # seconds
+ROADMAP_CACHE_MAX_BYTES = int(os.getenv("ROADMAP_CACHE_MAX_BYTES", 20 * 1024 * 1024))
+
+_cache_lock = threading.Lock()
+_cache_counters = {"hits": 0, "misses": 0}
+
+
+def roadmap_cache_key(email_text, start_date, target_date, mode):
+    # start_date is today's date, so entries stop matching once the day changes
+    material = json.dumps([email_text, MODEL_NAME, start_date, target_date, mode])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+def _count_cache(outcome):
+    with _cache_lock:
+        _cache_counters[outcome] += 1
+
+
+def get_cache_stats():
+    with _cache_lock:
+        stats = dict(_cache_counters)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    stats.update(roadmap_cache_usage())
+    return stats
+
+
+def get_llm_stats():
+    return llm.metrics()
+
 
 # -------------------- DATE EXTRACTION --------------------
 def extract_target_date(text):
-    patterns = [
-        r"\b\d{1,2}\s(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\s\d{4}",
-        r"\b\d{1,2}/\d{1,2}/\d{4}",
-        r"(January|February|March|April|May|June|July|August|September|October|November|December)\s\d{1,2},\s\d{4}"
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            date_str = match.group()
-            for fmt in ("%d %b %Y", "%d/%m/%Y", "%B %d, %Y"):
-                try:
-                    return datetime.strptime(date_str, fmt)
-                except:
-                    pass
-    return None
+    """Most relevant interview/drive date in text (see date_scanner.rank_dates), or None."""
+    target = best_date(text)
+    return datetime.combine(target, datetime.min.time()) if target else None
 
 
 # -------------------- PROMPT BUILDER --------------------
@@ -165,15 +190,108 @@ REMEMBER:
 
 
 
+# -------------------- STREAMING JSON PARSER --------------------
+ROADMAP_ARRAY_START = re.compile(r'"roadmap"\s*:\s*\[')
+
+
+class RoadmapItemParser:
+    """
+    Incremental parser for the model's JSON output. feed() it text chunks as
+    they arrive; it returns each element of the "roadmap" array as soon as
+    that element is complete, long before the whole document is.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+
+    def feed(self, text):
+        self._buffer += text
+        items = []
+
+        if self._finished:
+            return items
+
+        if not self._in_array:
+            match = ROADMAP_ARRAY_START.search(self._buffer)
+            if not match:
+                return items
+            self._in_array = True
+            self._pos = match.end()
+
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            ch = buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 0:
+                        items.append(self._take_item(self._pos + 1))
+
+            elif ch == '"':
+                if self._depth == 0:
+                    self._item_start = self._pos
+                self._in_string = True
+
+            elif ch in "{[":
+                if self._depth == 0:
+                    self._item_start = self._pos
+                self._depth += 1
+
+            elif ch in "}]" and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 0:
+                    items.append(self._take_item(self._pos + 1))
+
+            elif self._depth == 0 and ch in ",]":
+                # End of a bare scalar element, if one was open
+                if self._item_start is not None:
+                    items.append(self._take_item(self._pos))
+                if ch == "]":
+                    self._finished = True
+                    self._pos += 1
+                    break
+
+            elif self._depth == 0 and self._item_start is None and not ch.isspace():
+                self._item_start = self._pos
+
+            self._pos += 1
+
+        return items
+
+    def _take_item(self, end):
+        item = json.loads(self._buffer[self._item_start:end])
+        self._item_start = None
+        return item
+
+
 # -------------------- MAIN ROADMAP GENERATOR --------------------
-def generate_study_roadmap(email_text):
+def plan_roadmap(email_text, target_date=None):
+    """
+    Dates, granularity and cache key for an email; no model call.
+    target_date (ISO string) skips date extraction when already known.
+    """
     today = datetime.today().date()
 
-    target_date = extract_target_date(email_text)
     if target_date:
-        target_date = target_date.date()
+        target_date = datetime.strptime(target_date, "%Y-%m-%d").date()
     else:
-        target_date = today + timedelta(days=1)
+        target_date = extract_target_date(email_text)
+        if target_date:
+            target_date = target_date.date()
+        else:
+            target_date = today + timedelta(days=1)
 
     total_days = (target_date - today).days
     if total_days <= 0:
@@ -182,20 +300,40 @@ def generate_study_roadmap(email_text):
     # Decide roadmap granularity
     mode = "DAY" if total_days >= 3 else "HOUR"
 
-    prompt = build_roadmap_prompt(
+    start_date = today.strftime("%Y-%m-%d")
+    target_date = target_date.strftime("%Y-%m-%d")
+
+    return {
+        "mode": mode,
+        "start_date": start_date,
+        "target_date": target_date,
+        "total_days": total_days,
+        "cache_key": roadmap_cache_key(email_text, start_date, target_date, mode)
+    }
+
+
+def _lookup_cache(plan, use_cache):
+    if not use_cache:
+        return None
+
+    cached = get_cached_roadmap(plan["cache_key"], ttl=ROADMAP_CACHE_TTL)
+    _count_cache("hits" if cached is not None else "misses")
+    ROADMAP_CACHE_LOOKUPS.inc(result="hit" if cached is not None else "miss")
+    return cached
+
+
+def _prompt_for(email_text, plan):
+    return build_roadmap_prompt(
         email_text=email_text,
-        start_date=today.strftime("%Y-%m-%d"),
-        target_date=target_date.strftime("%Y-%m-%d"),
-        total_days=total_days,
-        mode=mode
+        start_date=plan["start_date"],
+        target_date=plan["target_date"],
+        total_days=plan["total_days"],
+        mode=plan["mode"]
     )
 
-    response = client.models.generate_content(
-        model=MODEL_NAME,
-        contents=prompt
-    )
 
-    raw_text = response.text.strip()
+def _parse_model_json(raw_text):
+    raw_text = raw_text.strip()
     # Remove markdown code blocks if present
     raw_text = re.sub(r"```json\s*", "", raw_text)
     raw_text = re.sub(r"```\s*", "", raw_text)
@@ -205,27 +343,82 @@ def generate_study_roadmap(email_text):
         raise ValueError("Empty response from Gemini")
 
     try:
-        roadmap_json = json.loads(raw_text)
+        return json.loads(raw_text)
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON returned by Gemini:\n{raw_text}") from e
 
 
-    # return {
-    #     "mode": mode,
-    #     "start_date": today.strftime("%Y-%m-%d"),
-    #     "target_date": target_date.strftime("%Y-%m-%d"),
-    #     "total_days": total_days,
-    #     "roadmap": roadmap_json["roadmap"]
-    # }
+def _finish_roadmap(plan, roadmap_json):
     roadmap_list = roadmap_json.get("roadmap", [])
     if not roadmap_list:
         # If AI did not return roadmap, fallback to default
         roadmap_list = ["No roadmap could be generated from this email."]
 
-    return {
-        "mode": mode,
-        "start_date": today.strftime("%Y-%m-%d"),
-        "target_date": target_date.strftime("%Y-%m-%d"),
-        "total_days": total_days,
+    result = {
+        "mode": plan["mode"],
+        "start_date": plan["start_date"],
+        "target_date": plan["target_date"],
+        "total_days": plan["total_days"],
         "roadmap": roadmap_list
-    }
\ No newline at end of file
+    }
+
+    store_cached_roadmap(plan["cache_key"], result, max_bytes=ROADMAP_CACHE_MAX_BYTES)
+    return result
+
+
+def generate_study_roadmap(email_text, use_cache=True, target_date=None):
+    plan = plan_roadmap(email_text, target_date)
+
+    cached = _lookup_cache(plan, use_cache)
+    if cached is not None:
+        return cached
+
+    raw_text = llm.generate(_prompt_for(email_text, plan))
+
+    return _finish_roadmap(plan, _parse_model_json(raw_text))
+
+
+def build_roadmap_response(email, use_cache=True):
+    """Roadmap job result for a stored email row (see db.fetch_email_by_id)."""
+    combined_text = f"{email['subject']} {email['body']}"
+    # Drive date parsed at ingest; only re-parsed here when it is missing
+    roadmap = generate_study_roadmap(combined_text, use_cache=use_cache, target_date=email["drive_date"])
+
+    return {
+        "email_subject": email["subject"],
+        "roadmap": roadmap
+    }
+
+
+def stream_study_roadmap(email_text, use_cache=True, target_date=None):
+    """
+    Streaming variant of generate_study_roadmap. Yields ("meta", plan) first,
+    then ("item", step) for each roadmap step as soon as the model has
+    finished writing it, then ("done", result) with the full roadmap.
+    """
+    plan = plan_roadmap(email_text, target_date)
+    yield "meta", {key: value for key, value in plan.items() if key != "cache_key"}
+
+    cached = _lookup_cache(plan, use_cache)
+    if cached is not None:
+        for step in cached["roadmap"]:
+            yield "item", step
+        yield "done", cached
+        return
+
+    parser = RoadmapItemParser()
+    chunks = []
+    emitted = 0
+
+    for text in llm.stream(_prompt_for(email_text, plan)):
+        chunks.append(text)
+        for step in parser.feed(text):
+            emitted += 1
+            yield "item", step
+
+    result = _finish_roadmap(plan, _parse_model_json("".join(chunks)))
+
+    # Anything the incremental parser could not see (e.g. the fallback step)
+    for step in result["roadmap"][emitted:]:
+        yield "item", step
+    yield "done", result
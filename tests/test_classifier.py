@@ -0,0 +1,38 @@
+import pytest
+
+import classifier
+from benchmarks.bench_classifier import legacy_classify_email, make_corpus
+
+CORPUS = make_corpus(300, 200) + [
+    ("Campus drive", "Apply by Friday"),
+    ("TPO update", "Company visiting next week"),
+    ("TPO update", "Library timings changed"),
+    ("Holiday notice", "College closed on Monday"),
+    ("", ""),
+    ("Re:", "contact the tpoffer letter desk"),
+]
+
+
+@pytest.fixture(params=["automaton", "in scans"])
+def matcher(request, monkeypatch):
+    if request.param == "automaton":
+        if classifier.ahocorasick is None:
+            pytest.skip("pyahocorasick not installed")
+    else:
+        monkeypatch.setattr(classifier, "ahocorasick", None)
+    matcher = classifier.KeywordMatcher(classifier._matcher.keywords)
+    monkeypatch.setattr(classifier, "_matcher", matcher)
+    return matcher
+
+
+def test_matches_legacy_classifier(matcher):
+    for subject, body in CORPUS:
+        expected = legacy_classify_email(subject, body)
+        assert classifier.classify_email(subject, body) == expected, (subject, body)
+        assert classifier.classify_email_explained(subject, body)[0] == expected, (subject, body)
+
+
+def test_find_all_matches_substring_semantics(matcher):
+    for subject, body in CORPUS:
+        text = f"{subject} {body}".lower()
+        assert matcher.find_all(text) == {word for word in matcher.keywords if word in text}
@@ -0,0 +1,30 @@
+from datetime import date
+
+import pytest
+
+from date_scanner import best_date, scan_dates
+
+TODAY = date(2026, 3, 1)
+
+
+@pytest.mark.parametrize("text", [
+    "Students with CGPA above 7 may apply",
+    "Top 10 may be shortlisted",
+    "Only 3 may attend the final round",
+])
+def test_modal_may_is_not_a_date(text):
+    assert scan_dates(text, TODAY) == []
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Interview on 7 May", date(2026, 5, 7)),
+    ("Campus visit on 7th May", date(2026, 5, 7)),
+    ("Results on 7 May 2027", date(2027, 5, 7)),
+    ("Drive date: May 10", date(2026, 5, 10)),
+    ("Technical round: Wednesday, 12 March 2026", date(2026, 3, 12)),
+    ("Last date to register: 5 Mar 2026. Interview on 12 Mar 2026.", date(2026, 3, 12)),
+    # Labels are whole words: "around" and "background" hold no "round"
+    ("Interview on 12 Mar 2026. Background verification documents around 25 Mar 2026.", date(2026, 3, 12)),
+])
+def test_best_date(text, expected):
+    assert best_date(text, TODAY) == expected
@@ -0,0 +1,67 @@
+import base64
+import multiprocessing
+import sqlite3
+
+import pytest
+
+import db
+
+
+def _start_app(path, barrier, errors):
+    db.DB_NAME = path
+    barrier.wait()
+    try:
+        db.create_table_if_not_exists()
+    except Exception as e:
+        errors.put(repr(e))
+
+
+def test_concurrent_startup_applies_each_migration_once(tmp_db):
+    # Flask, uvicorn and manage.py starting together on a fresh database
+    context = multiprocessing.get_context("fork")
+    barrier = context.Barrier(4)
+    errors = context.Queue()
+    processes = [context.Process(target=_start_app, args=(tmp_db, barrier, errors)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+
+    assert [process.exitcode for process in processes] == [0] * 4
+    assert errors.empty(), errors.get()
+
+    conn = sqlite3.connect(tmp_db)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(db.MIGRATIONS)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(emails)")]
+    assert columns.count("snippet") == 1
+    conn.close()
+
+
+def test_migrations_are_idempotent(tmp_db):
+    db.create_table_if_not_exists()
+    db.create_table_if_not_exists()
+    conn = db.get_db_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(db.MIGRATIONS)
+
+
+def test_malformed_page_cursors_raise_value_error():
+    for payload in (
+        b"[1, null]", b"[1, \"x\"]", b"{}", b"[1]", b"not json",
+        # Sort values that SQLite cannot bind, or that no row has
+        b"[[1], 3]", b"[{\"a\": 1}, 3]", b"[1.5, 3]", b"[true, 3]",
+    ):
+        cursor = base64.urlsafe_b64encode(payload).decode()
+        with pytest.raises(ValueError):
+            db.decode_page_cursor(cursor)
+
+    assert db.decode_page_cursor(db.encode_page_cursor("2026-01-01", 7)) == ("2026-01-01", 7)
+
+
+def test_listing_with_unbindable_cursor_raises_value_error(tmp_db):
+    db.create_table_if_not_exists()
+    cursor = base64.urlsafe_b64encode(b"[[1], 3]").decode()
+
+    with pytest.raises(ValueError):
+        db.fetch_email_page(cursor=cursor)
+    with pytest.raises(ValueError):
+        db.fetch_upcoming_drives("2026-01-01", cursor=cursor)
@@ -0,0 +1,71 @@
+import logging
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+import gmail_service
+from benchmarks.fake_gmail import FakeGmailService, _FakeRequest
+
+
+class FlakyGmailService(FakeGmailService):
+    """Fails the first `failures` gets of each message in `statuses` with that HTTP status."""
+
+    def __init__(self, count, statuses, failures=1):
+        super().__init__(count, rtt=0, per_message=0)
+        self.statuses = statuses
+        self.remaining = {msg_id: failures for msg_id in statuses}
+        self.retries = {}
+
+    def get(self, userId, id, format='raw'):
+        request = super().get(userId, id, format)
+        service = self
+
+        class Request(_FakeRequest):
+            def execute(self, http=None, num_retries=0):
+                service.retries[id] = num_retries
+                # googleapiclient retries 429 and 5xx num_retries times itself
+                attempts = 1 + (num_retries if service.statuses.get(id, 0) >= 429 else 0)
+                if service.remaining.get(id, 0) >= attempts:
+                    raise HttpError(httplib2.Response({"status": service.statuses[id]}), b"")
+                service.remaining[id] = 0
+                return request.execute()
+
+        return Request(self, None)
+
+    def new_batch_http_request(self, callback=None):
+        batch = super().new_batch_http_request(callback)
+        service = self
+
+        def execute(http=None):
+            for request_id, request, on_response in batch._requests:
+                if request_id in service.statuses:
+                    on_response(request_id, None, HttpError(httplib2.Response({"status": 429}), b""))
+                else:
+                    on_response(request_id, service._response(request_id, "full"), None)
+
+        batch.execute = execute
+        return batch
+
+
+def test_rate_limited_batch_parts_are_retried():
+    service = FlakyGmailService(10, {"msg000003": 429, "msg000007": 503}, failures=3)
+
+    messages, failed = gmail_service.download_messages(service, service.ids, concurrency=1, batch_size=10)
+
+    assert set(messages) == set(service.ids)
+    assert failed == []
+    assert service.retries["msg000003"] == gmail_service.FETCH_RETRIES
+
+
+def test_messages_failing_for_good_are_skipped_and_logged(caplog):
+    service = FlakyGmailService(10, {"msg000002": 404, "msg000004": 403, "msg000006": 500}, failures=100)
+
+    with caplog.at_level(logging.WARNING, logger="gmail_service"):
+        messages, failed = gmail_service.download_messages(service, service.ids, concurrency=1, batch_size=10)
+
+    assert set(messages) == set(service.ids) - {"msg000002", "msg000004", "msg000006"}
+    # Deleted messages are gone for good; the others can be fetched again later
+    assert sorted(failed) == ["msg000004", "msg000006"]
+    logged = caplog.text
+    assert "msg000004" in logged and "msg000006" in logged
+    assert "msg000002" not in logged
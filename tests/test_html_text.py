@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+import html_text
+from benchmarks.bench_html import newsletter
+
+CONVERTERS = sorted(html_text.HTML_CONVERTERS)
+# bs4 returns get_text() as is, without the line and space handling below
+NEW_CONVERTERS = [name for name in CONVERTERS if name != "bs4"]
+
+# Edge cases every converter must agree with BeautifulSoup on
+CASES = [
+    "",
+    "plain text, no tags",
+    "<p>Drive on <b>12 Mar</b> &amp; interview&nbsp;after</p>",
+    "<html><head><title>Hiring</title><style>p { color: red }</style></head>"
+    "<body><script>var x = '<p>not text</p>';</script><p>Visible</p></body></html>",
+    "<div>unclosed <span>tags <p>everywhere",
+    "<table><tr><td>CTC</td><td>12 LPA</td></tr><tr><td>Role</td><td>SDE</td></tr></table>",
+    "line one<br>line two<br/>line three<hr>",
+    "<!-- hidden comment --><p>after comment</p>",
+    "<p>&#8377; 10,00,000 &lt;per annum&gt; &copy; caf&eacute;</p>",
+    "<ul><li>Apply</li><li>Register</li></ul><pre>  keep   code  </pre>",
+    "<p>Unicode: ünïcödé — “quotes” 日本語</p>",
+]
+SAMPLES = CASES + [newsletter(0, 40, random.Random(0))]
+
+
+def reference(html):
+    # The conversion the converters replaced
+    BeautifulSoup = pytest.importorskip("bs4").BeautifulSoup
+    return BeautifulSoup(html, "html.parser").get_text()
+
+
+def same_text(a, b):
+    # Equivalent when the visible characters match, whitespace aside; only
+    # the new converters put block elements on lines and collapse spaces
+    return "".join(a.split()) == "".join(b.split())
+
+
+@pytest.mark.parametrize("name", CONVERTERS)
+@pytest.mark.parametrize("html", SAMPLES, ids=range(len(SAMPLES)))
+def test_matches_beautifulsoup(name, html):
+    assert same_text(html_text.HTML_CONVERTERS[name](html), reference(html))
+
+
+@pytest.mark.parametrize("name", NEW_CONVERTERS)
+@pytest.mark.parametrize("depth", [300, 1500, 3000])
+def test_deeply_nested_text_is_kept(name, depth):
+    html = "<p>intro</p>" + "<blockquote>" * depth + "deep" + "</blockquote>" * depth + "outro"
+
+    text = html_text.HTML_CONVERTERS[name](html)
+
+    assert text.split() == ["intro", "deep", "outro"]
+
+
+@pytest.mark.parametrize("name", NEW_CONVERTERS)
+def test_scripts_and_comments_are_dropped(name):
+    html = "<div>a<script>x()</script>b<!-- note -->c<p>d</p>e</div>"
+
+    assert html_text.HTML_CONVERTERS[name](html) == "abc\nd\ne"
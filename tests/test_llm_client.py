@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from llm_client import FakeBackend, LLMClient, LLMTimeout, RetryableError
+
+
+def make_client(backend, **options):
+    options = {"requests_per_minute": 60_000, "burst": 100, "timeout": 5, "backoff_base": 0.001, **options}
+    return LLMClient(backend, "fake-model", **options)
+
+
+def busy(status=503, retry_after=None):
+    return RetryableError("busy", status=status, retry_after=retry_after)
+
+
+def test_retryable_errors_are_retried():
+    backend = FakeBackend("ok", failures=[busy(), busy(429)])
+    client = make_client(backend)
+
+    assert client.generate("prompt") == "ok"
+    assert backend.calls == 3
+    metrics = client.metrics()
+    assert (metrics["retries"], metrics["rate_limited"], metrics["succeeded"]) == (2, 1, 1)
+
+
+def test_retry_waits_at_least_retry_after():
+    backend = FakeBackend("ok", failures=[busy(429, retry_after=0.2)])
+    client = make_client(backend)
+
+    started = time.monotonic()
+    assert client.generate("prompt") == "ok"
+    assert time.monotonic() - started >= 0.2
+
+
+def test_gives_up_after_max_retries():
+    backend = FakeBackend("ok", failures=[busy()] * 3)
+    client = make_client(backend, max_retries=1)
+
+    with pytest.raises(RetryableError):
+        client.generate("prompt")
+    assert backend.calls == 2
+    assert client.metrics()["failed"] == 1
+
+
+def test_other_errors_are_not_retried():
+    backend = FakeBackend("ok", failures=[ValueError("bad request")])
+    client = make_client(backend)
+
+    with pytest.raises(ValueError):
+        client.generate("prompt")
+    assert backend.calls == 1
+
+
+def test_slow_backend_hits_deadline():
+    backend = FakeBackend("ok", latency=1.0)
+    client = make_client(backend, timeout=0.1)
+
+    started = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        client.generate("prompt")
+    assert time.monotonic() - started < 0.5
+    assert client.metrics()["timeouts"] == 1
+
+
+def test_retry_after_past_deadline_fails_without_waiting():
+    backend = FakeBackend("ok", failures=[busy(429, retry_after=10)])
+    client = make_client(backend, timeout=1)
+
+    started = time.monotonic()
+    with pytest.raises(LLMTimeout):
+        client.generate("prompt")
+    assert time.monotonic() - started < 0.5
+    assert backend.calls == 1
+
+
+def test_concurrent_calls_are_capped():
+    backend = FakeBackend("ok", latency=0.05)
+    client = make_client(backend, max_concurrency=2)
+
+    threads = [threading.Thread(target=client.generate, args=("prompt",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert backend.calls == 8
+    assert backend.max_in_flight == 2
+
+
+def test_stream_retries_before_first_chunk():
+    backend = FakeBackend("streamed text", failures=[busy()])
+    client = make_client(backend)
+
+    assert "".join(client.stream("prompt")) == "streamed text"
+    assert backend.calls == 2
+
+
+class FailsMidStream(FakeBackend):
+    def stream(self, model, prompt, timeout):
+        self.calls += 1
+        yield "first chunk"
+        raise busy()
+
+
+def test_stream_is_not_retried_after_first_chunk():
+    backend = FailsMidStream()
+    client = make_client(backend)
+
+    received = []
+    with pytest.raises(RetryableError):
+        for piece in client.stream("prompt"):
+            received.append(piece)
+    assert received == ["first chunk"]
+    assert backend.calls == 1
@@ -0,0 +1,53 @@
+import pytest
+
+import metrics
+
+
+def test_large_values_render_exactly():
+    counter = metrics.Counter("test_bytes_total", "Bytes", ("kind",))
+    counter.inc(1234567, kind="body")
+    histogram = metrics.Histogram("test_wait_seconds", "Wait", buckets=(0.5, 1))
+    histogram.observe(1234567.25)
+
+    assert 'test_bytes_total{kind="body"} 1234567.0' in counter.render()
+    lines = histogram.render().splitlines()
+    assert "test_wait_seconds_sum 1234567.25" in lines
+    assert 'test_wait_seconds_bucket{le="0.5"} 0' in lines
+
+
+def request_count(method, endpoint, status):
+    series = metrics.HTTP_REQUEST_SECONDS._series.get((method, endpoint, str(status)))
+    return series[-1] if series else 0
+
+
+def fail(email_id):
+    raise RuntimeError("storage down")
+
+
+def test_flask_request_that_raises_is_timed_as_500(monkeypatch):
+    import app
+
+    monkeypatch.setattr(app, "fetch_email_by_id", fail)
+    monkeypatch.setitem(app.app.config, "PROPAGATE_EXCEPTIONS", True)
+    before = request_count("GET", "/api/email/<int:email_id>", 500)
+
+    with pytest.raises(RuntimeError):
+        app.app.test_client().get("/api/email/1")
+
+    assert request_count("GET", "/api/email/<int:email_id>", 500) == before + 1
+    assert metrics._request_spans.get() is None
+
+
+def test_asgi_request_that_raises_is_timed_as_500(monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import asgi
+
+    monkeypatch.setattr(asgi, "fetch_email_by_id", fail)
+    before = request_count("GET", "/api/email/{email_id}", 500)
+
+    with pytest.raises(RuntimeError):
+        TestClient(asgi.app).get("/api/email/1")
+
+    assert request_count("GET", "/api/email/{email_id}", 500) == before + 1
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+psycopg2 = pytest.importorskip("psycopg2")
+
+import pg_db
+
+pytestmark = pytest.mark.skipif(not os.getenv("PG_DSN"), reason="set PG_DSN to a scratch Postgres database")
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(pg_db, "PG_DSN", os.environ["PG_DSN"])
+    pg_db.close_pool()
+    yield pg_db.get_pool()
+    pg_db.close_pool()
+
+
+def test_error_rolls_back_before_returning_connection(pool):
+    with pytest.raises(RuntimeError):
+        with pg_db.pooled_connection() as conn, conn.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE pooled_rollback (id int)")
+            raise RuntimeError
+
+    with pg_db.pooled_connection() as conn, conn.cursor() as cursor:
+        assert conn.info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        cursor.execute("SELECT to_regclass('pg_temp.pooled_rollback')")
+        assert cursor.fetchone() == (None,)
+
+
+def test_dropped_connection_is_not_reused(pool):
+    with pytest.raises(psycopg2.OperationalError):
+        with pg_db.pooled_connection() as conn, conn.cursor() as cursor:
+            dropped = conn
+            cursor.execute("SELECT pg_terminate_backend(pg_backend_pid())")
+
+    with pg_db.pooled_connection() as conn, conn.cursor() as cursor:
+        assert conn is not dropped
+        cursor.execute("SELECT 1")
+        assert cursor.fetchone() == (1,)
@@ -0,0 +1,26 @@
+import db
+from pipeline import run_ingest
+from test_gmail_service import FlakyGmailService
+
+
+def sync(service):
+    return run_ingest(service, store=db, sync_mode="incremental", max_results=50, concurrency=1, batch_size=10)
+
+
+def test_message_failing_for_good_is_fetched_by_a_later_sync(tmp_db):
+    db.create_table_if_not_exists()
+    service = FlakyGmailService(10, {"msg000012": 500}, failures=100)
+    assert sync(service)["stored"] == 10
+
+    service.add_messages(5)
+    result = sync(service)
+    assert (result["stored"], result["failed"]) == (4, 1)
+
+    # Gmail recovers: the cursor did not move past msg000012, so it is listed again
+    service.statuses.clear()
+    service.remaining.clear()
+    result = sync(service)
+    assert (result["listed"], result["skipped"], result["stored"], result["failed"]) == (5, 4, 1, 0)
+    assert db.find_existing_gmail_ids(["msg000012"]) == {"msg000012"}
+
+    assert sync(service)["listed"] == 0
@@ -0,0 +1,36 @@
+from datetime import date
+
+from date_scanner import best_date
+from placement_facts import extract_placement_facts
+
+TODAY = date(2026, 3, 1)
+
+
+class _Today(date):
+    @classmethod
+    def today(cls):
+        return TODAY
+
+
+def test_drive_date_matches_roadmap_target(monkeypatch):
+    monkeypatch.setattr("date_scanner.date", _Today)
+    text = "Circular dated 1 Feb 2026. Selected students report on 15 Dec 2026."
+
+    facts = extract_placement_facts("Campus drive", text)
+
+    assert facts["drive_date"] == "2026-12-15"
+    assert best_date(f"Campus drive\n{text}") == date(2026, 12, 15)
+
+
+def test_deadline_is_not_used_as_drive_date(monkeypatch):
+    monkeypatch.setattr("date_scanner.date", _Today)
+
+    facts = extract_placement_facts("Registration", "Last date to register: 20 Mar 2026")
+
+    assert facts["drive_date"] is None
+    assert facts["deadline"] == "2026-03-20"
+
+
+def test_modal_may_is_not_stored_as_drive_date():
+    facts = extract_placement_facts("Hiring", "Students with CGPA above 7 may apply")
+    assert facts["drive_date"] is None
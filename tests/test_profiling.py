@@ -0,0 +1,62 @@
+import os
+import threading
+
+import pytest
+from flask import Flask
+
+import profiling
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "_recent", profiling.deque())
+    app = Flask(__name__)
+
+    @app.route("/ok")
+    def ok():
+        return "ok"
+
+    @app.route("/boom")
+    def boom():
+        raise RuntimeError("boom")
+
+    profiling.init_app(app)
+    return app
+
+
+def sampler_threads():
+    return [thread for thread in threading.enumerate() if thread.name == "profile-sampler"]
+
+
+@pytest.mark.parametrize("mode", ["sample", "cprofile"])
+def test_failing_request_still_finishes_profile(app, tmp_path, mode):
+    # As under app.run(debug=True): the error propagates and no response is made
+    app.config["PROPAGATE_EXCEPTIONS"] = True
+    with pytest.raises(RuntimeError):
+        app.test_client().get(f"/boom?profile={mode}")
+
+    assert not sampler_threads()
+    [record] = profiling.recent_profiles()
+    assert record["mode"] == mode
+    assert "status" not in record
+    assert "RuntimeError" in record["error"]
+    assert os.path.exists(tmp_path / record["file"])
+
+
+def test_handled_error_records_status(app):
+    response = app.test_client().get("/boom?profile=sample")
+
+    [record] = profiling.recent_profiles()
+    assert response.status_code == 500
+    assert record["status"] == 500
+    assert not sampler_threads()
+
+
+def test_profiled_response_carries_profile_id(app):
+    response = app.test_client().get("/ok?profile=sample")
+
+    [record] = profiling.recent_profiles()
+    assert response.headers["X-Profile-Id"] == record["id"]
+    assert record["status"] == 200
+    assert not sampler_threads()